@@ -0,0 +1,23 @@
+from django.contrib import admin
+
+from .models import GeocodeJob
+
+
+@admin.register(GeocodeJob)
+class GeocodeJobAdmin(admin.ModelAdmin):
+    list_display = (
+        'address',
+        'status',
+        'attempts',
+        'created_at',
+        'finished_at',
+        'next_attempt_at',
+    )
+    list_filter = ('status', )
+    search_fields = ('address', )
+    actions = ('retry_jobs', )
+
+    @admin.action(description='Повторить ошибочные задачи')
+    def retry_jobs(self, request, queryset):
+        retried = queryset.retry()
+        self.message_user(request, f'Задач снова в очереди: {retried}')
@@ -0,0 +1,86 @@
+import math
+
+from geopy import distance
+
+from star_burger import settings
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+EARTH_RADIUS_KM = 6371.0088
+
+
+def haversine_matrix_numpy(origins, destinations):
+    origins = numpy.radians(numpy.asarray(origins, dtype=float).reshape(-1, 2))
+    destinations = numpy.radians(
+        numpy.asarray(destinations, dtype=float).reshape(-1, 2)
+    )
+
+    origin_lat = origins[:, 0][:, numpy.newaxis]
+    origin_lon = origins[:, 1][:, numpy.newaxis]
+    destination_lat = destinations[:, 0][numpy.newaxis, :]
+    destination_lon = destinations[:, 1][numpy.newaxis, :]
+
+    a = (
+        numpy.sin((destination_lat - origin_lat) / 2) ** 2
+        + numpy.cos(origin_lat) * numpy.cos(destination_lat)
+        * numpy.sin((destination_lon - origin_lon) / 2) ** 2
+    )
+    matrix = 2 * EARTH_RADIUS_KM * numpy.arcsin(
+        numpy.sqrt(numpy.clip(a, 0, 1))
+    )
+    return matrix.tolist()
+
+
+def haversine_km(origin, destination):
+    origin_lat, origin_lon = map(math.radians, origin)
+    destination_lat, destination_lon = map(math.radians, destination)
+
+    a = (
+        math.sin((destination_lat - origin_lat) / 2) ** 2
+        + math.cos(origin_lat) * math.cos(destination_lat)
+        * math.sin((destination_lon - origin_lon) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(min(max(a, 0), 1)))
+
+
+def haversine_matrix_python(origins, destinations):
+    return [
+        [haversine_km(origin, destination) for destination in destinations]
+        for origin in origins
+    ]
+
+
+def geodesic_matrix_geopy(origins, destinations):
+    return [
+        [
+            distance.distance(origin, destination).km
+            for destination in destinations
+        ]
+        for origin in origins
+    ]
+
+
+DISTANCE_ENGINES = {
+    'numpy': haversine_matrix_numpy,
+    'python': haversine_matrix_python,
+    'geopy': geodesic_matrix_geopy,
+}
+
+
+def get_distance_matrix(origins, destinations, engine=None):
+    origins = list(origins)
+    destinations = list(destinations)
+    if not origins or not destinations:
+        return [[] for _ in origins]
+
+    engine = engine or settings.DISTANCE_ENGINE
+    if engine not in DISTANCE_ENGINES:
+        raise ValueError(f'Unknown distance engine: {engine}')
+    if engine == 'numpy' and numpy is None:
+        engine = 'python'
+
+    return DISTANCE_ENGINES[engine](origins, destinations)
@@ -0,0 +1,116 @@
+import threading
+from collections import Counter, OrderedDict
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.utils import timezone
+
+from addresses.geocoders import get_geocoder
+from addresses.models import Place
+from addresses.normalization import normalize_address
+from star_burger import settings
+
+
+STATS_NAMES = ('memory_hits', 'db_hits', 'misses', 'not_found')
+
+
+def get_stats_key(name):
+    return f'geocode_cache:stats:{name}'
+
+
+class GeocodeCache:
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.stats = Counter()
+        self.lock = threading.Lock()
+
+    def is_fresh(self, updated_at):
+        return timezone.now() - updated_at < self.ttl
+
+    def remember(self, address, coordinates, updated_at):
+        with self.lock:
+            self.entries[address] = (coordinates, updated_at)
+            self.entries.move_to_end(address)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def get_from_memory(self, address):
+        with self.lock:
+            entry = self.entries.get(address)
+            if entry is None:
+                return None
+            if not self.is_fresh(entry[1]):
+                del self.entries[address]
+                return None
+            self.entries.move_to_end(address)
+            return entry
+
+    def count(self, name):
+        with self.lock:
+            self.stats[name] += 1
+
+    def flush_stats(self):
+        with self.lock:
+            stats, self.stats = self.stats, Counter()
+        for name, value in stats.items():
+            key = get_stats_key(name)
+            try:
+                cache.incr(key, value)
+            except ValueError:
+                cache.set(key, value, timeout=None)
+
+    def get_coordinates(self, address):
+        normalized_address = normalize_address(address)
+        entry = self.get_from_memory(normalized_address)
+        if entry:
+            self.count('memory_hits')
+            return entry[0]
+
+        place = Place.objects.filter(
+            normalized_address=normalized_address
+        ).first()
+        if place and self.is_fresh(place.last_updated):
+            self.count('db_hits')
+            coordinates = place.get_coordinates()
+            self.remember(normalized_address, coordinates, place.last_updated)
+            return coordinates
+
+        self.count('misses')
+        coordinates = get_geocoder().fetch_coordinates(address)
+        if not coordinates:
+            self.count('not_found')
+
+        if not place:
+            place = Place(address=address)
+        place.lat, place.lon = coordinates if coordinates else (None, None)
+        place.last_updated = timezone.now()
+        place.save()
+
+        self.remember(normalized_address, coordinates, place.last_updated)
+        return coordinates
+
+    def get_stats(self):
+        self.flush_stats()
+        stats = {
+            name: cache.get(get_stats_key(name), 0) for name in STATS_NAMES
+        }
+        lookups = stats['memory_hits'] + stats['db_hits'] + stats['misses']
+        hits = stats['memory_hits'] + stats['db_hits']
+        return {
+            **stats,
+            'lookups': lookups,
+            'hit_rate': hits / lookups if lookups else 0,
+        }
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+geocode_cache = GeocodeCache(
+    maxsize=settings.GEOCODE_CACHE_SIZE,
+    ttl=timedelta(days=settings.GEOCODE_CACHE_TTL_DAYS),
+)
@@ -0,0 +1,85 @@
+import hashlib
+import json
+
+import requests
+from django.utils.module_loading import import_string
+
+from addresses.normalization import normalize_address
+from addresses.yandex_geo_api import GeocoderUnavailable, YandexGeocoderClient
+from star_burger import settings
+
+
+def hash_coordinates(address):
+    digest = hashlib.sha256(normalize_address(address).encode()).digest()
+    lat = 55.55 + int.from_bytes(digest[:4], 'big') / 2 ** 32 * 0.4
+    lon = 37.35 + int.from_bytes(digest[4:8], 'big') / 2 ** 32 * 0.5
+    return round(lat, 6), round(lon, 6)
+
+
+class BaseGeocoder:
+
+    def __init__(self, **options):
+        pass
+
+    def fetch_coordinates(self, address):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class YandexGeocoder(BaseGeocoder):
+
+    def __init__(self, apikey=None, **options):
+        self.client = YandexGeocoderClient(
+            apikey or settings.YANDEX_GEO_API_KEY,
+            **options
+        )
+
+    def fetch_coordinates(self, address):
+        try:
+            coordinates = self.client.fetch_coordinates(address)
+        except requests.RequestException as error:
+            raise GeocoderUnavailable(str(error)) from error
+        if not coordinates:
+            return None
+        lat, lon = coordinates
+        return float(lat), float(lon)
+
+    def close(self):
+        self.client.close()
+
+
+class OfflineGeocoder(BaseGeocoder):
+
+    def __init__(self, fixture_path=None, **options):
+        fixture_path = fixture_path or settings.GEOCODER_FIXTURE
+        self.fixtures = {}
+        if fixture_path:
+            with open(fixture_path, encoding='utf-8') as fixture_file:
+                self.fixtures = {
+                    normalize_address(address): (
+                        tuple(coordinates) if coordinates else None
+                    )
+                    for address, coordinates in json.load(fixture_file).items()
+                }
+
+    def fetch_coordinates(self, address):
+        normalized_address = normalize_address(address)
+        if normalized_address in self.fixtures:
+            return self.fixtures[normalized_address]
+        return hash_coordinates(address)
+
+
+def create_geocoder(**options):
+    return import_string(settings.GEOCODER_BACKEND)(**options)
+
+
+_geocoder = None
+
+
+def get_geocoder():
+    global _geocoder
+    if _geocoder is None:
+        _geocoder = create_geocoder()
+    return _geocoder
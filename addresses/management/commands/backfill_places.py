@@ -0,0 +1,152 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from addresses.geocoders import GeocoderUnavailable, create_geocoder
+from addresses.models import Place
+from addresses.normalization import normalize_address
+from addresses.throttling import RateLimiter
+from foodcartapp.cache_versions import bump_version
+from foodcartapp.models import Order, OrderCandidate, Restaurant
+from foodcartapp.restaurant_index import RestaurantLocator
+from star_burger import settings
+
+
+class Command(BaseCommand):
+    help = 'Геокодирует адреса ресторанов и заказов, для которых нет координат'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--threads',
+            type=int,
+            default=settings.GEOCODE_WORKER_THREADS,
+        )
+        parser.add_argument(
+            '--rate',
+            type=float,
+            default=settings.GEOCODE_RATE_LIMIT,
+            help='Не больше стольких запросов к геокодеру в секунду',
+        )
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def get_addresses_without_coordinates(self):
+        addresses = set(
+            Restaurant.objects.exclude(address='')
+            .values_list('address', flat=True)
+        )
+        addresses.update(
+            Order.objects.exclude(address='')
+            .values_list('address', flat=True)
+        )
+        addresses_by_key = {
+            normalize_address(address): address for address in addresses
+        }
+        geocoded_keys = set(
+            Place.objects.filter(
+                normalized_address__in=addresses_by_key,
+                lat__isnull=False
+            ).values_list('normalized_address', flat=True)
+        )
+        return sorted(
+            address for key, address in addresses_by_key.items()
+            if key not in geocoded_keys
+        )
+
+    def refresh_candidates(self, geocoded_keys):
+        OrderCandidate.objects.refresh_for_restaurants(
+            restaurant.pk for restaurant in Restaurant.objects.only('address')
+            if normalize_address(restaurant.address) in geocoded_keys
+        )
+        open_orders = Order.objects.exclude(status='CO').only('address')
+        OrderCandidate.objects.refresh_for_orders([
+            order for order in open_orders
+            if normalize_address(order.address) in geocoded_keys
+        ])
+
+    def handle(self, *args, **options):
+        addresses = self.get_addresses_without_coordinates()
+        if not addresses:
+            self.stdout.write('Все адреса уже геокодированы')
+            return
+
+        geocoder = create_geocoder(pool_maxsize=options['threads'])
+        rate_limiter = RateLimiter(options['rate'])
+
+        def geocode(address):
+            rate_limiter.wait()
+            try:
+                return address, geocoder.fetch_coordinates(address), None
+            except GeocoderUnavailable as error:
+                return address, None, error
+
+        started_at = time.monotonic()
+        with ThreadPoolExecutor(max_workers=options['threads']) as executor:
+            results = list(executor.map(geocode, addresses))
+        elapsed = max(time.monotonic() - started_at, 0.001)
+        geocoder.close()
+
+        existing_keys = set(
+            Place.objects.filter(
+                normalized_address__in=[
+                    normalize_address(address) for address in addresses
+                ]
+            ).values_list('normalized_address', flat=True)
+        )
+        coordinates_by_key = {}
+        new_places = []
+        failures = []
+        now = timezone.now()
+        for address, coordinates, error in results:
+            if error:
+                failures.append((address, error))
+                continue
+            key = normalize_address(address)
+            lat, lon = coordinates if coordinates else (None, None)
+            coordinates_by_key[key] = (lat, lon)
+            if key not in existing_keys:
+                new_places.append(Place(
+                    address=address,
+                    normalized_address=key,
+                    lat=lat,
+                    lon=lon,
+                    last_updated=now
+                ))
+
+        Place.objects.bulk_create(
+            new_places,
+            batch_size=options['batch_size'],
+            ignore_conflicts=True
+        )
+        places = Place.objects.in_bulk(
+            list(coordinates_by_key),
+            field_name='normalized_address'
+        )
+        for key, place in places.items():
+            place.lat, place.lon = coordinates_by_key[key]
+            place.last_updated = now
+        Place.objects.bulk_update(
+            places.values(),
+            ['lat', 'lon', 'last_updated'],
+            batch_size=options['batch_size']
+        )
+        bump_version(RestaurantLocator.version_name)
+        self.refresh_candidates({
+            key for key, (lat, lon) in coordinates_by_key.items()
+            if lat is not None
+        })
+
+        not_found = [
+            address for address, coordinates, error in results
+            if not coordinates and not error
+        ]
+        self.stdout.write(
+            f'Адресов: {len(addresses)}, за {elapsed:.1f} с '
+            f'({len(addresses) / elapsed:.1f} адр/с). '
+            f'Создано: {len(new_places)}, '
+            f'обновлено: {len(places) - len(new_places)}, '
+            f'не найдено: {len(not_found)}, ошибок: {len(failures)}'
+        )
+        for address, error in failures:
+            self.stderr.write(f'{address}: {error}')
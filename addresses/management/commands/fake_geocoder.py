@@ -0,0 +1,82 @@
+import json
+import random
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from django.core.management.base import BaseCommand
+
+from addresses.geocoders import hash_coordinates
+
+
+def make_handler(latency, error_rate):
+
+    class FakeGeocoderHandler(BaseHTTPRequestHandler):
+
+        def do_GET(self):
+            time.sleep(latency)
+            if random.random() < error_rate:
+                self.send_error(503)
+                return
+
+            query = parse_qs(urlparse(self.path).query)
+            address = query.get('geocode', [''])[0]
+            feature_member = []
+            if address:
+                lat, lon = hash_coordinates(address)
+                feature_member.append({
+                    'GeoObject': {'Point': {'pos': f'{lon} {lat}'}}
+                })
+
+            body = json.dumps({
+                'response': {
+                    'GeoObjectCollection': {'featureMember': feature_member}
+                }
+            }).encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return FakeGeocoderHandler
+
+
+class Command(BaseCommand):
+    help = (
+        'Запускает локальную заглушку геокодера Яндекса для нагрузочного '
+        'тестирования. Укажите YANDEX_GEO_API_URL=http://127.0.0.1:8001/1.x'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--port', type=int, default=8001)
+        parser.add_argument(
+            '--latency',
+            type=float,
+            default=0,
+            help='Задержка ответа в секундах',
+        )
+        parser.add_argument(
+            '--error-rate',
+            type=float,
+            default=0,
+            help='Доля ответов с ошибкой 503, от 0 до 1',
+        )
+
+    def handle(self, *args, **options):
+        server = ThreadingHTTPServer(
+            ('127.0.0.1', options['port']),
+            make_handler(options['latency'], options['error_rate'])
+        )
+        self.stdout.write(
+            f'Заглушка геокодера слушает http://127.0.0.1:{options["port"]}/1.x'
+        )
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
@@ -0,0 +1,97 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import F
+from django.utils import timezone
+
+from addresses.geocode_cache import geocode_cache
+from addresses.models import GeocodeJob
+from addresses.yandex_geo_api import GeocoderCircuitOpen
+from addresses.signals import address_geocoded
+from star_burger import settings
+
+
+def get_retry_delay(attempts):
+    return timedelta(seconds=min(
+        settings.GEOCODE_JOB_RETRY_DELAY * 2 ** (attempts - 1),
+        settings.GEOCODE_JOB_MAX_RETRY_DELAY
+    ))
+
+
+def process_job(job):
+    try:
+        geocode_cache.get_coordinates(job.address)
+    except GeocoderCircuitOpen as error:
+        GeocodeJob.objects.filter(pk=job.pk).update(
+            status='PE',
+            error=repr(error),
+            next_attempt_at=timezone.now() + timedelta(
+                seconds=settings.GEOCODER_CIRCUIT_RESET_TIMEOUT
+            )
+        )
+        return False
+    except Exception as error:
+        attempts = job.attempts + 1
+        status = 'PE' if attempts < settings.GEOCODE_JOB_MAX_ATTEMPTS else 'FA'
+        GeocodeJob.objects.filter(pk=job.pk).update(
+            status=status,
+            attempts=F('attempts') + 1,
+            error=repr(error),
+            finished_at=timezone.now(),
+            next_attempt_at=timezone.now() + get_retry_delay(attempts)
+        )
+        return False
+    else:
+        GeocodeJob.objects.filter(pk=job.pk).update(
+            status='DO',
+            attempts=F('attempts') + 1,
+            error='',
+            finished_at=timezone.now()
+        )
+        address_geocoded.send(sender=GeocodeJob, address=job.address)
+        return True
+    finally:
+        connection.close()
+
+
+class Command(BaseCommand):
+    help = 'Геокодирует адреса из очереди GeocodeJob'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--threads',
+            type=int,
+            default=settings.GEOCODE_WORKER_THREADS,
+        )
+        parser.add_argument('--batch-size', type=int, default=50)
+        parser.add_argument('--poll-interval', type=float, default=2)
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Обработать очередь и выйти',
+        )
+
+    def handle(self, *args, **options):
+        stale_after = timedelta(seconds=settings.GEOCODE_JOB_TIMEOUT)
+
+        with ThreadPoolExecutor(max_workers=options['threads']) as executor:
+            while True:
+                jobs = GeocodeJob.objects.claim(
+                    options['batch_size'],
+                    stale_after
+                )
+                if not jobs:
+                    if options['once']:
+                        return
+                    time.sleep(options['poll_interval'])
+                    continue
+
+                results = list(executor.map(process_job, jobs))
+                geocode_cache.flush_stats()
+                self.stdout.write(
+                    f'Обработано адресов: {results.count(True)}, '
+                    f'ошибок: {results.count(False)}'
+                )
@@ -0,0 +1,23 @@
+# Generated by Django 3.2.15 on 2026-10-18 04:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('addresses', '0002_alter_place_last_updated'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='place',
+            name='lat',
+            field=models.FloatField(blank=True, null=True, verbose_name='Широта'),
+        ),
+        migrations.AlterField(
+            model_name='place',
+            name='lon',
+            field=models.FloatField(blank=True, null=True, verbose_name='Долгота'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 3.2.15 on 2026-10-18 04:39
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('addresses', '0003_place_nullable_coordinates'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GeocodeJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('address', models.CharField(db_index=True, max_length=250, verbose_name='Адрес')),
+                ('status', models.CharField(choices=[('PE', 'Ожидает'), ('IP', 'В работе'), ('DO', 'Выполнено'), ('FA', 'Ошибка')], db_index=True, default='PE', max_length=3, verbose_name='Статус')),
+                ('attempts', models.PositiveIntegerField(default=0, verbose_name='Попыток')),
+                ('error', models.TextField(blank=True, verbose_name='Последняя ошибка')),
+                ('created_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now, verbose_name='Время постановки в очередь')),
+                ('started_at', models.DateTimeField(blank=True, null=True, verbose_name='Время начала обработки')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='Время завершения')),
+            ],
+            options={
+                'verbose_name': 'Задача геокодирования',
+                'verbose_name_plural': 'Задачи геокодирования',
+            },
+        ),
+        migrations.AlterField(
+            model_name='place',
+            name='address',
+            field=models.CharField(max_length=250, unique=True, verbose_name='Адрес'),
+        ),
+    ]
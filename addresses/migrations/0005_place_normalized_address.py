@@ -0,0 +1,81 @@
+# Generated by Django 3.2.15 on 2026-10-18 05:02
+
+import re
+
+from django.db import migrations, models
+
+
+ABBREVIATIONS = {
+    'г': 'город',
+    'ул': 'улица',
+    'пр-т': 'проспект',
+    'просп': 'проспект',
+    'пр-кт': 'проспект',
+    'пер': 'переулок',
+    'пл': 'площадь',
+    'б-р': 'бульвар',
+    'бул': 'бульвар',
+    'наб': 'набережная',
+    'ш': 'шоссе',
+    'д': 'дом',
+    'к': 'корпус',
+    'корп': 'корпус',
+    'стр': 'строение',
+    'кв': 'квартира',
+}
+
+OPTIONAL_WORDS = {'город', 'улица', 'дом'}
+
+TOKEN_PATTERN = re.compile(r'\w+(?:-\w+)*')
+
+
+def normalize_address(address):
+    address = address.lower().replace('ё', 'е')
+    tokens = [
+        ABBREVIATIONS.get(token, token)
+        for token in TOKEN_PATTERN.findall(address)
+    ]
+    return ' '.join(token for token in tokens if token not in OPTIONAL_WORDS)
+
+
+def merge_duplicate_places(apps, schema_editor):
+    Place = apps.get_model('addresses', 'Place')
+
+    places_by_key = {}
+    for place in Place.objects.order_by('pk'):
+        places_by_key.setdefault(
+            normalize_address(place.address),
+            []
+        ).append(place)
+
+    for normalized_address, places in places_by_key.items():
+        canonical_place = max(
+            places,
+            key=lambda place: (place.lat is not None, place.last_updated)
+        )
+        Place.objects.filter(
+            pk__in=[place.pk for place in places if place != canonical_place]
+        ).delete()
+        canonical_place.normalized_address = normalized_address
+        canonical_place.save(update_fields=['normalized_address'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('addresses', '0004_geocodejob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='place',
+            name='normalized_address',
+            field=models.CharField(max_length=250, null=True, verbose_name='Нормализованный адрес'),
+        ),
+        migrations.RunPython(merge_duplicate_places, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='place',
+            name='normalized_address',
+            field=models.CharField(max_length=250, unique=True, verbose_name='Нормализованный адрес'),
+        ),
+    ]
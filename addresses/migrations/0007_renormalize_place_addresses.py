@@ -0,0 +1,65 @@
+# Generated by Django 3.2.15 on 2026-10-18 09:12
+
+import re
+
+from django.db import migrations
+
+
+ABBREVIATIONS = {
+    'г': 'город',
+    'ул': 'улица',
+    'пр-т': 'проспект',
+    'просп': 'проспект',
+    'пр-кт': 'проспект',
+    'пер': 'переулок',
+    'пл': 'площадь',
+    'б-р': 'бульвар',
+    'бул': 'бульвар',
+    'наб': 'набережная',
+    'ш': 'шоссе',
+    'д': 'дом',
+    'к': 'корпус',
+    'корп': 'корпус',
+    'стр': 'строение',
+    'кв': 'квартира',
+}
+
+OPTIONAL_WORDS = {'город', 'улица', 'дом'}
+
+TOKEN_PATTERN = re.compile(r'\w+(?:-\w+)*')
+
+
+def normalize_address(address):
+    address = address.lower().replace('ё', 'е')
+    tokens = [
+        ABBREVIATIONS.get(token, token)
+        for token in TOKEN_PATTERN.findall(address)
+    ]
+    return ' '.join(token for token in tokens if token not in OPTIONAL_WORDS)
+
+
+def renormalize_places(apps, schema_editor):
+    Place = apps.get_model('addresses', 'Place')
+
+    changed_places = []
+    for place in Place.objects.only('pk', 'address', 'normalized_address'):
+        normalized_address = normalize_address(place.address)
+        if place.normalized_address != normalized_address:
+            place.normalized_address = normalized_address
+            changed_places.append(place)
+    Place.objects.bulk_update(
+        changed_places,
+        ['normalized_address'],
+        batch_size=500
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('addresses', '0006_geocodejob_next_attempt_at'),
+    ]
+
+    operations = [
+        migrations.RunPython(renormalize_places, migrations.RunPython.noop),
+    ]
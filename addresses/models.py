@@ -1,16 +1,39 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Q
 from django.utils import timezone
 
+from addresses.normalization import normalize_address
+
+
+class PlaceQuerySet(models.QuerySet):
+
+    def for_address(self, address):
+        return self.filter(normalized_address=normalize_address(address))
+
+    def for_addresses(self, addresses):
+        return self.filter(
+            normalized_address__in={
+                normalize_address(address) for address in addresses
+            }
+        )
+
 
 class Place(models.Model):
-    address = models.CharField('Адрес', max_length=100, unique=True)
-    lat = models.FloatField('Широта')
-    lon = models.FloatField('Долгота')
+    address = models.CharField('Адрес', max_length=250, unique=True)
+    normalized_address = models.CharField(
+        'Нормализованный адрес',
+        max_length=250,
+        unique=True
+    )
+    lat = models.FloatField('Широта', null=True, blank=True)
+    lon = models.FloatField('Долгота', null=True, blank=True)
     last_updated = models.DateTimeField(
         'Время последнего обновления',
         default=timezone.now
     )
 
+    objects = PlaceQuerySet.as_manager()
+
     class Meta:
         verbose_name = 'Адрес'
         verbose_name_plural = 'Адреса'
@@ -18,5 +41,100 @@ class Place(models.Model):
     def __str__(self):
         return self.address
 
+    def save(self, *args, **kwargs):
+        self.normalized_address = normalize_address(self.address)
+        super().save(*args, **kwargs)
+
     def get_coordinates(self):
+        if self.lat is None or self.lon is None:
+            return None
         return float(self.lat), float(self.lon)
+
+
+class GeocodeJobQuerySet(models.QuerySet):
+
+    def enqueue(self, address):
+        if Place.objects.for_address(address).exists():
+            return None
+        job = self.filter(
+            address=address,
+            status__in=['PE', 'IP', 'FA']
+        ).first()
+        if not job:
+            return self.create(address=address)
+        if job.status == 'FA':
+            self.filter(pk=job.pk).retry()
+        return job
+
+    def retry(self):
+        return self.filter(status='FA').update(
+            status='PE',
+            attempts=0,
+            next_attempt_at=timezone.now()
+        )
+
+    def claim(self, batch_size, stale_after):
+        now = timezone.now()
+        with transaction.atomic():
+            jobs = list(
+                self.select_for_update(skip_locked=True)
+                .filter(
+                    Q(status='PE', next_attempt_at__lte=now)
+                    | Q(status='IP', started_at__lt=now - stale_after)
+                )
+                .order_by('next_attempt_at')[:batch_size]
+            )
+            self.filter(pk__in=[job.pk for job in jobs]).update(
+                status='IP',
+                started_at=timezone.now()
+            )
+        return jobs
+
+
+class GeocodeJob(models.Model):
+    JOB_STATUS_CHOICES = [
+        ('PE', 'Ожидает'),
+        ('IP', 'В работе'),
+        ('DO', 'Выполнено'),
+        ('FA', 'Ошибка'),
+    ]
+
+    address = models.CharField('Адрес', max_length=250, db_index=True)
+    status = models.CharField(
+        'Статус',
+        max_length=3,
+        choices=JOB_STATUS_CHOICES,
+        default='PE',
+        db_index=True
+    )
+    attempts = models.PositiveIntegerField('Попыток', default=0)
+    error = models.TextField('Последняя ошибка', blank=True)
+    created_at = models.DateTimeField(
+        'Время постановки в очередь',
+        default=timezone.now,
+        db_index=True
+    )
+    started_at = models.DateTimeField(
+        'Время начала обработки',
+        blank=True,
+        null=True
+    )
+    finished_at = models.DateTimeField(
+        'Время завершения',
+        blank=True,
+        null=True
+    )
+    next_attempt_at = models.DateTimeField(
+        'Время следующей попытки',
+        default=timezone.now,
+        db_index=True
+    )
+
+    objects = GeocodeJobQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = 'Задача геокодирования'
+        verbose_name_plural = 'Задачи геокодирования'
+
+    def __str__(self):
+        return f'{self.address} ({self.get_status_display()})'
@@ -0,0 +1,34 @@
+import re
+
+
+ABBREVIATIONS = {
+    'г': 'город',
+    'ул': 'улица',
+    'пр-т': 'проспект',
+    'просп': 'проспект',
+    'пр-кт': 'проспект',
+    'пер': 'переулок',
+    'пл': 'площадь',
+    'б-р': 'бульвар',
+    'бул': 'бульвар',
+    'наб': 'набережная',
+    'ш': 'шоссе',
+    'д': 'дом',
+    'к': 'корпус',
+    'корп': 'корпус',
+    'стр': 'строение',
+    'кв': 'квартира',
+}
+
+OPTIONAL_WORDS = {'город', 'улица', 'дом'}
+
+TOKEN_PATTERN = re.compile(r'\w+(?:-\w+)*')
+
+
+def normalize_address(address):
+    address = address.lower().replace('ё', 'е')
+    tokens = [
+        ABBREVIATIONS.get(token, token)
+        for token in TOKEN_PATTERN.findall(address)
+    ]
+    return ' '.join(token for token in tokens if token not in OPTIONAL_WORDS)
@@ -0,0 +1,4 @@
+from django.dispatch import Signal
+
+
+address_geocoded = Signal()
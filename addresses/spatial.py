@@ -0,0 +1,106 @@
+import math
+from collections import defaultdict
+
+from addresses.distances import get_distance_matrix
+
+
+KM_PER_DEGREE = 111.195
+
+
+class GridIndex:
+
+    def __init__(self, cell_size=0.05, max_rings=64):
+        self.cell_size = cell_size
+        self.max_rings = max_rings
+        self.points = {}
+        self.cells = defaultdict(set)
+
+    def __len__(self):
+        return len(self.points)
+
+    def get_cell(self, lat, lon):
+        return (
+            math.floor(lat / self.cell_size),
+            math.floor(lon / self.cell_size),
+        )
+
+    def add(self, key, lat, lon):
+        self.remove(key)
+        self.points[key] = (lat, lon)
+        self.cells[self.get_cell(lat, lon)].add(key)
+
+    def remove(self, key):
+        point = self.points.pop(key, None)
+        if point is None:
+            return
+        cell = self.get_cell(*point)
+        self.cells[cell].discard(key)
+        if not self.cells[cell]:
+            del self.cells[cell]
+
+    def measure(self, lat, lon, keys):
+        keys = list(keys)
+        if not keys:
+            return []
+        distances = get_distance_matrix(
+            [(lat, lon)],
+            [self.points[key] for key in keys]
+        )[0]
+        return sorted(zip(keys, distances), key=lambda item: item[1])
+
+    def get_ring_keys(self, center_cell, ring):
+        row, column = center_cell
+        keys = []
+        for cell_row in range(row - ring, row + ring + 1):
+            for cell_column in range(column - ring, column + ring + 1):
+                if max(abs(cell_row - row), abs(cell_column - column)) != ring:
+                    continue
+                keys.extend(self.cells.get((cell_row, cell_column), ()))
+        return keys
+
+    def within(self, lat, lon, radius_km):
+        lat_span = radius_km / KM_PER_DEGREE
+        lon_span = radius_km / (
+            KM_PER_DEGREE * max(math.cos(math.radians(lat)), 0.01)
+        )
+        min_row, min_column = self.get_cell(lat - lat_span, lon - lon_span)
+        max_row, max_column = self.get_cell(lat + lat_span, lon + lon_span)
+
+        keys = []
+        for cell_row in range(min_row, max_row + 1):
+            for cell_column in range(min_column, max_column + 1):
+                keys.extend(self.cells.get((cell_row, cell_column), ()))
+
+        return [
+            (key, distance) for key, distance in self.measure(lat, lon, keys)
+            if distance <= radius_km
+        ]
+
+    def get_ring_distance(self, lat, ring):
+        span = ring * self.cell_size
+        poleward_lat = min(abs(lat) + span + self.cell_size, 90)
+        return 2 * KM_PER_DEGREE * math.degrees(math.asin(
+            math.cos(math.radians(poleward_lat))
+            * math.sin(math.radians(span) / 2)
+        ))
+
+    def nearest(self, lat, lon, k):
+        center_cell = self.get_cell(lat, lon)
+
+        found = []
+        seen = 0
+        ring = 0
+        while seen < len(self.points):
+            if ring > self.max_rings:
+                return self.measure(lat, lon, self.points)[:k]
+            ring_keys = self.get_ring_keys(center_cell, ring)
+            seen += len(ring_keys)
+            found.extend(self.measure(lat, lon, ring_keys))
+            found.sort(key=lambda item: item[1])
+            if (
+                len(found) >= k
+                and found[k - 1][1] <= self.get_ring_distance(lat, ring)
+            ):
+                break
+            ring += 1
+        return found[:k]
@@ -1,3 +1,513 @@
-from django.test import TestCase
+import json
+import random
+from datetime import timedelta
+from io import StringIO
+from tempfile import NamedTemporaryFile
+from unittest.mock import patch
 
-# Create your tests here.
+import requests
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import SimpleTestCase, TestCase, TransactionTestCase
+from django.utils import timezone
+
+from addresses.distances import get_distance_matrix
+from addresses.geocode_cache import GeocodeCache, geocode_cache
+from addresses.geocoders import OfflineGeocoder, hash_coordinates
+from addresses.management.commands.geocode_worker import process_job
+from addresses.models import GeocodeJob, Place
+from addresses.normalization import normalize_address
+from addresses.spatial import GridIndex
+from addresses.yandex_geo_api import (
+    CircuitBreaker,
+    GeocoderCircuitOpen,
+    GeocoderUnavailable,
+    YandexGeocoderClient,
+)
+from foodcartapp.models import (
+    Order,
+    OrderItem,
+    Product,
+    Restaurant,
+    RestaurantMenuItem,
+)
+
+
+class GeocodeJobTest(TestCase):
+
+    def setUp(self):
+        geocode_cache.clear()
+        self.job = GeocodeJob.objects.enqueue('Москва, Тверская, 1')
+
+    def claim(self):
+        return GeocodeJob.objects.claim(10, timedelta(minutes=5))
+
+    def process(self, geocoder_error=None, coordinates=(55.76, 37.61)):
+        job, = self.claim()
+        with patch('addresses.geocode_cache.get_geocoder') as get_geocoder:
+            fetch_coordinates = get_geocoder.return_value.fetch_coordinates
+            fetch_coordinates.side_effect = geocoder_error
+            fetch_coordinates.return_value = coordinates
+            with patch(
+                'addresses.management.commands.geocode_worker.connection'
+            ):
+                process_job(job)
+        job.refresh_from_db()
+        return job
+
+    def test_claimed_job_is_not_claimed_twice(self):
+        self.assertEqual(self.claim(), [self.job])
+        self.assertEqual(self.claim(), [])
+
+    def test_successful_job_saves_place(self):
+        job = self.process()
+
+        self.assertEqual(job.status, 'DO')
+        place = Place.objects.for_address('Москва, Тверская, 1').get()
+        self.assertEqual(place.get_coordinates(), (55.76, 37.61))
+
+    def test_failed_job_is_retried_with_backoff(self):
+        job = self.process(GeocoderUnavailable('timeout'))
+
+        self.assertEqual((job.status, job.attempts), ('PE', 1))
+        self.assertGreater(job.next_attempt_at, timezone.now())
+        self.assertEqual(self.claim(), [])
+
+        GeocodeJob.objects.update(next_attempt_at=timezone.now())
+        first_delay = job.next_attempt_at - job.finished_at
+        job = self.process(GeocoderUnavailable('timeout'))
+        self.assertEqual(job.attempts, 2)
+        self.assertGreater(job.next_attempt_at - job.finished_at, first_delay)
+
+    def test_open_circuit_does_not_count_as_attempt(self):
+        job = self.process(GeocoderCircuitOpen('circuit is open'))
+
+        self.assertEqual((job.status, job.attempts), ('PE', 0))
+        self.assertGreater(job.next_attempt_at, timezone.now())
+
+    @patch('star_burger.settings.GEOCODE_JOB_MAX_ATTEMPTS', 1)
+    def test_failed_job_is_requeued(self):
+        job = self.process(GeocoderUnavailable('timeout'))
+        self.assertEqual(job.status, 'FA')
+
+        self.assertEqual(
+            GeocodeJob.objects.enqueue('Москва, Тверская, 1'),
+            self.job
+        )
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('PE', 0))
+        self.assertEqual(self.claim(), [self.job])
+
+
+class BackfillPlacesTest(TestCase):
+
+    def setUp(self):
+        geocode_cache.clear()
+        self.restaurant = Restaurant.objects.create(
+            name='Star Burger Тверская',
+            address='Москва, Тверская, 1'
+        )
+
+    def backfill(self, fetch_coordinates):
+        with patch(
+            'addresses.management.commands.backfill_places.create_geocoder'
+        ) as create_geocoder:
+            create_geocoder.return_value.fetch_coordinates = fetch_coordinates
+            call_command(
+                'backfill_places',
+                threads=1,
+                rate=0,
+                stdout=StringIO()
+            )
+
+    def test_place_created_during_backfill_is_updated(self):
+        bulk_create = Place.objects.bulk_create
+
+        def create_place_concurrently(places, **kwargs):
+            Place.objects.create(address=self.restaurant.address)
+            return bulk_create(places, **kwargs)
+
+        with patch.object(
+            Place.objects,
+            'bulk_create',
+            create_place_concurrently
+        ):
+            self.backfill(lambda address: (55.76, 37.61))
+
+        place = Place.objects.for_address(self.restaurant.address).get()
+        self.assertEqual(place.get_coordinates(), (55.76, 37.61))
+
+    def test_backfill_refreshes_order_candidates(self):
+        product = Product.objects.create(name='Бургер', price=100)
+        RestaurantMenuItem.objects.create(
+            restaurant=self.restaurant,
+            product=product
+        )
+        order = Order.objects.create(
+            firstname='Иван',
+            lastname='Петров',
+            phonenumber='+79291234567',
+            address='Москва, Тверская, 10'
+        )
+        OrderItem.objects.create(
+            order=order,
+            product=product,
+            quantity=1,
+            price=100
+        )
+
+        self.backfill(hash_coordinates)
+
+        self.assertEqual(
+            list(order.candidates.values_list('restaurant_id', flat=True)),
+            [self.restaurant.pk]
+        )
+
+
+class GeocodeCacheTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        geocode_cache.clear()
+
+    def get_coordinates(self, address, coordinates=(55.76, 37.61)):
+        with patch('addresses.geocode_cache.get_geocoder') as get_geocoder:
+            get_geocoder.return_value.fetch_coordinates.return_value = (
+                coordinates
+            )
+            return geocode_cache.get_coordinates(address)
+
+    def test_lookups_are_counted_in_shared_cache(self):
+        self.get_coordinates('Москва, Тверская, 1')
+        self.get_coordinates('Москва, Тверская, 1')
+        geocode_cache.clear()
+        self.get_coordinates('москва тверская 1')
+        geocode_cache.flush_stats()
+
+        stats = GeocodeCache(maxsize=10, ttl=timedelta(days=1)).get_stats()
+
+        self.assertEqual(
+            (stats['misses'], stats['memory_hits'], stats['db_hits']),
+            (1, 1, 1)
+        )
+        self.assertAlmostEqual(stats['hit_rate'], 2 / 3)
+
+    def test_not_found_address_is_cached(self):
+        self.assertIsNone(self.get_coordinates('Нигде', coordinates=None))
+        geocode_cache.clear()
+
+        with patch('addresses.geocode_cache.get_geocoder') as get_geocoder:
+            self.assertIsNone(geocode_cache.get_coordinates('Нигде'))
+        get_geocoder.assert_not_called()
+
+    def test_stale_place_is_geocoded_again(self):
+        self.get_coordinates('Москва, Тверская, 1')
+        Place.objects.update(last_updated=timezone.now() - timedelta(days=365))
+        geocode_cache.clear()
+
+        coordinates = self.get_coordinates(
+            'Москва, Тверская, 1',
+            coordinates=(55.7, 37.6)
+        )
+
+        self.assertEqual(coordinates, (55.7, 37.6))
+        self.assertEqual(
+            Place.objects.get().get_coordinates(),
+            (55.7, 37.6)
+        )
+
+
+@patch('addresses.yandex_geo_api.time.monotonic')
+class CircuitBreakerTest(SimpleTestCase):
+
+    def setUp(self):
+        self.circuit_breaker = CircuitBreaker(
+            failure_threshold=2,
+            reset_timeout=30
+        )
+
+    def test_opens_after_threshold(self, monotonic):
+        monotonic.return_value = 100
+        self.circuit_breaker.record_failure()
+        self.assertTrue(self.circuit_breaker.allow_request())
+
+        self.circuit_breaker.record_failure()
+
+        self.assertFalse(self.circuit_breaker.allow_request())
+        monotonic.return_value = 129
+        self.assertFalse(self.circuit_breaker.allow_request())
+
+    def test_lets_one_probe_through_when_half_open(self, monotonic):
+        monotonic.return_value = 100
+        self.circuit_breaker.record_failure()
+        self.circuit_breaker.record_failure()
+
+        monotonic.return_value = 130
+        self.assertTrue(self.circuit_breaker.allow_request())
+        self.assertFalse(self.circuit_breaker.allow_request())
+
+        self.circuit_breaker.record_success()
+        self.assertTrue(self.circuit_breaker.allow_request())
+        self.assertTrue(self.circuit_breaker.allow_request())
+
+    def test_failed_probe_keeps_circuit_open(self, monotonic):
+        monotonic.return_value = 100
+        self.circuit_breaker.record_failure()
+        self.circuit_breaker.record_failure()
+
+        monotonic.return_value = 130
+        self.assertTrue(self.circuit_breaker.allow_request())
+        self.circuit_breaker.record_failure()
+
+        monotonic.return_value = 159
+        self.assertFalse(self.circuit_breaker.allow_request())
+
+    def test_open_circuit_skips_request(self, monotonic):
+        monotonic.return_value = 100
+        client = YandexGeocoderClient(
+            'apikey',
+            retries=0,
+            circuit_breaker=self.circuit_breaker
+        )
+        with patch.object(client.session, 'get') as get:
+            get.side_effect = requests.ConnectionError
+            for _ in range(2):
+                with self.assertRaises(requests.ConnectionError):
+                    client.fetch_coordinates('Москва, Тверская, 1')
+
+            with self.assertRaises(GeocoderCircuitOpen):
+                client.fetch_coordinates('Москва, Тверская, 1')
+
+        self.assertEqual(get.call_count, 2)
+
+
+class NormalizeAddressTest(SimpleTestCase):
+
+    def test_spellings_of_one_address_match(self):
+        self.assertEqual(
+            normalize_address('г. Москва, ул. Тверская, д. 1'),
+            normalize_address('Москва,  Тверская улица 1')
+        )
+        self.assertEqual(
+            normalize_address('Санкт-Петербург, Невский пр-т, 28'),
+            normalize_address('санкт-петербург невский проспект 28')
+        )
+        self.assertEqual(
+            normalize_address('Москва, Щёлковское ш., 5 корп. 2'),
+            normalize_address('Москва, Щелковское шоссе, 5 к 2')
+        )
+
+    def test_different_addresses_do_not_match(self):
+        self.assertNotEqual(
+            normalize_address('Москва, Тверская, 1'),
+            normalize_address('Москва, Тверская, 1 кв 1')
+        )
+        self.assertNotEqual(
+            normalize_address('Москва, пр Мира, 1'),
+            normalize_address('Москва, проспект Мира, 1')
+        )
+
+
+class MergeDuplicatePlacesMigrationTest(TransactionTestCase):
+
+    migrate_from = [('addresses', '0004_geocodejob')]
+    migrate_to = [('addresses', '0005_place_normalized_address')]
+
+    def migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+    def tearDown(self):
+        self.migrate(MigrationExecutor(connection).loader.graph.leaf_nodes())
+
+    def test_duplicates_are_merged_into_geocoded_place(self):
+        apps = self.migrate(self.migrate_from)
+        Place = apps.get_model('addresses', 'Place')
+        now = timezone.now()
+        Place.objects.create(
+            address='Москва, Тверская, 1',
+            lat=55.757,
+            lon=37.613,
+            last_updated=now - timedelta(days=1)
+        )
+        Place.objects.create(address='г. Москва, ул. Тверская, д. 1')
+        Place.objects.create(
+            address='Москва, Тверская улица, 1',
+            lat=55.758,
+            lon=37.614,
+            last_updated=now
+        )
+        Place.objects.create(address='Москва, Арбат, 10')
+
+        apps = self.migrate(self.migrate_to)
+        Place = apps.get_model('addresses', 'Place')
+
+        self.assertEqual(
+            dict(Place.objects.values_list('normalized_address', 'lat')),
+            {
+                'москва тверская 1': 55.758,
+                'москва арбат 10': None,
+            }
+        )
+
+
+class GridIndexTest(SimpleTestCase):
+
+    def create_index(self, center_lat, center_lon, cell_size, spread):
+        randomizer = random.Random(center_lat)
+        index = GridIndex(cell_size=cell_size)
+        for key in range(300):
+            index.add(
+                key,
+                center_lat + randomizer.uniform(-spread, spread),
+                center_lon + randomizer.uniform(-spread, spread)
+            )
+        return index
+
+    def assert_matches_brute_force(self, index, lat, lon):
+        distances = index.measure(lat, lon, index.points)
+
+        for k in (1, 5, 20):
+            self.assertEqual(index.nearest(lat, lon, k), distances[:k])
+        for radius_km in (1, 10, 50):
+            self.assertEqual(
+                index.within(lat, lon, radius_km),
+                [item for item in distances if item[1] <= radius_km]
+            )
+
+    def test_matches_brute_force(self):
+        index = self.create_index(55.75, 37.62, 0.05, 0.5)
+
+        for lat, lon in [(55.75, 37.62), (55.3, 37.1), (56.5, 38.5)]:
+            self.assert_matches_brute_force(index, lat, lon)
+
+    def test_nearest_looks_into_poleward_rings(self):
+        index = GridIndex(cell_size=1)
+        index.add('south', 57.91, 0.5)
+        index.add('north-east', 74.93, 41.0)
+
+        self.assertEqual(
+            [key for key, _ in index.nearest(70.5, 0.5, 1)],
+            ['north-east']
+        )
+
+    def test_removed_point_is_not_found(self):
+        index = GridIndex()
+        index.add('near', 55.75, 37.62)
+        index.add('far', 55.8, 37.7)
+        index.add('near', 55.9, 37.9)
+        index.remove('far')
+
+        self.assertEqual(len(index), 1)
+        self.assertEqual(index.within(55.75, 37.62, 10), [])
+        self.assertEqual(
+            [key for key, _ in index.nearest(55.75, 37.62, 5)],
+            ['near']
+        )
+
+
+class DistanceMatrixTest(SimpleTestCase):
+
+    origins = [(55.751, 37.618), (59.939, 30.316), (69.0, 33.1)]
+    destinations = [(55.751, 37.618), (55.76, 37.65), (56.84, 60.6), (0, 0)]
+
+    def assert_matrices_close(self, matrix, expected, tolerance):
+        self.assertEqual(len(matrix), len(expected))
+        for row, expected_row in zip(matrix, expected):
+            self.assertEqual(len(row), len(expected_row))
+            for distance, expected_distance in zip(row, expected_row):
+                self.assertLessEqual(
+                    abs(distance - expected_distance),
+                    tolerance * max(expected_distance, 1)
+                )
+
+    def test_engines_agree(self):
+        python_matrix = get_distance_matrix(
+            self.origins,
+            self.destinations,
+            engine='python'
+        )
+
+        self.assert_matrices_close(
+            get_distance_matrix(
+                self.origins,
+                self.destinations,
+                engine='numpy'
+            ),
+            python_matrix,
+            1e-9
+        )
+        self.assert_matrices_close(
+            get_distance_matrix(
+                self.origins,
+                self.destinations,
+                engine='geopy'
+            ),
+            python_matrix,
+            0.005
+        )
+        self.assertEqual(python_matrix[0][0], 0)
+
+    def test_falls_back_to_python_without_numpy(self):
+        with patch('addresses.distances.numpy', None):
+            matrix = get_distance_matrix(
+                self.origins,
+                self.destinations,
+                engine='numpy'
+            )
+
+        self.assertEqual(
+            matrix,
+            get_distance_matrix(
+                self.origins,
+                self.destinations,
+                engine='python'
+            )
+        )
+
+    def test_empty_and_unknown_input(self):
+        self.assertEqual(get_distance_matrix([], self.destinations), [])
+        self.assertEqual(get_distance_matrix(self.origins, []), [[], [], []])
+        with self.assertRaises(ValueError):
+            get_distance_matrix(self.origins, self.destinations, engine='gps')
+
+
+class OfflineGeocoderTest(SimpleTestCase):
+
+    def test_hash_is_stable_for_one_address(self):
+        lat, lon = hash_coordinates('Москва, Тверская, 1')
+
+        self.assertEqual(
+            hash_coordinates('г. Москва, ул. Тверская, д. 1'),
+            (lat, lon)
+        )
+        self.assertNotEqual(hash_coordinates('Москва, Тверская, 2'), (lat, lon))
+        self.assertTrue(55.55 <= lat <= 55.95)
+        self.assertTrue(37.35 <= lon <= 37.85)
+
+    def test_fixture_overrides_hash(self):
+        with NamedTemporaryFile('w', suffix='.json') as fixture_file:
+            json.dump(
+                {
+                    'Москва, Арбат, 10': [55.75, 37.59],
+                    'Нигде, 1': None,
+                },
+                fixture_file,
+                ensure_ascii=False
+            )
+            fixture_file.flush()
+            geocoder = OfflineGeocoder(fixture_path=fixture_file.name)
+
+        self.assertEqual(
+            geocoder.fetch_coordinates('г. Москва, ул. Арбат, д. 10'),
+            (55.75, 37.59)
+        )
+        self.assertIsNone(geocoder.fetch_coordinates('Нигде, 1'))
+        self.assertEqual(
+            geocoder.fetch_coordinates('Москва, Тверская, 1'),
+            hash_coordinates('Москва, Тверская, 1')
+        )
@@ -1 +1,10 @@
+from django.urls import path
 
+from .views import geocode_cache_stats
+
+
+app_name = "addresses"
+
+urlpatterns = [
+    path('geocode-cache/', geocode_cache_stats, name='geocode_cache_stats'),
+]
@@ -1 +1,9 @@
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import JsonResponse
 
+from addresses.geocode_cache import geocode_cache
+
+
+@staff_member_required
+def geocode_cache_stats(request):
+    return JsonResponse(geocode_cache.get_stats())
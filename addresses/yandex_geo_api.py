@@ -1,19 +1,127 @@
+import threading
+import time
+
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from star_burger import settings
+
+
+class GeocoderUnavailable(Exception):
+    pass
+
+
+class GeocoderCircuitOpen(GeocoderUnavailable):
+    pass
+
+
+class CircuitBreaker:
+
+    def __init__(self, failure_threshold, reset_timeout):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.lock = threading.Lock()
+
+    def allow_request(self):
+        with self.lock:
+            if self.opened_at is None:
+                return True
+            if time.monotonic() - self.opened_at < self.reset_timeout:
+                return False
+            self.opened_at = time.monotonic()
+            return True
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+
+
+class YandexGeocoderClient:
+
+    def __init__(
+        self,
+        apikey,
+        base_url=None,
+        connect_timeout=None,
+        read_timeout=None,
+        retries=None,
+        backoff_factor=None,
+        pool_maxsize=10,
+        circuit_breaker=None,
+    ):
+        self.apikey = apikey
+        self.base_url = base_url or settings.YANDEX_GEO_API_URL
+        self.timeout = (
+            connect_timeout or settings.GEOCODER_CONNECT_TIMEOUT,
+            read_timeout or settings.GEOCODER_READ_TIMEOUT,
+        )
+        self.circuit_breaker = circuit_breaker or CircuitBreaker(
+            failure_threshold=settings.GEOCODER_CIRCUIT_FAILURES,
+            reset_timeout=settings.GEOCODER_CIRCUIT_RESET_TIMEOUT,
+        )
+
+        retry = Retry(
+            total=settings.GEOCODER_RETRIES if retries is None else retries,
+            backoff_factor=(
+                settings.GEOCODER_BACKOFF_FACTOR
+                if backoff_factor is None else backoff_factor
+            ),
+            status_forcelist=[429, 500, 502, 503, 504],
+            allowed_methods=['GET'],
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=pool_maxsize,
+            max_retries=retry
+        )
+        self.session = requests.Session()
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def fetch_coordinates(self, address):
+        if not self.circuit_breaker.allow_request():
+            raise GeocoderCircuitOpen('Yandex geocoder circuit is open')
+
+        try:
+            response = self.session.get(
+                self.base_url,
+                params={
+                    "geocode": address,
+                    "apikey": self.apikey,
+                    "format": "json",
+                },
+                timeout=self.timeout
+            )
+            response.raise_for_status()
+        except requests.HTTPError as error:
+            if error.response.status_code >= 500:
+                self.circuit_breaker.record_failure()
+            raise
+        except requests.RequestException:
+            self.circuit_breaker.record_failure()
+            raise
+        self.circuit_breaker.record_success()
+
+        found_places = response.json()['response']['GeoObjectCollection']['featureMember']
 
+        if not found_places:
+            return None
 
-def fetch_coordinates(apikey, address):
-    base_url = "https://geocode-maps.yandex.ru/1.x"
-    response = requests.get(base_url, params={
-        "geocode": address,
-        "apikey": apikey,
-        "format": "json",
-    })
-    response.raise_for_status()
-    found_places = response.json()['response']['GeoObjectCollection']['featureMember']
+        most_relevant = found_places[0]
+        lon, lat = most_relevant['GeoObject']['Point']['pos'].split(" ")
+        return lat, lon
 
-    if not found_places:
-        return None
+    def close(self):
+        self.session.close()
 
-    most_relevant = found_places[0]
-    lon, lat = most_relevant['GeoObject']['Point']['pos'].split(" ")
-    return lat, lon
@@ -13,6 +13,10 @@ import NoResults from "./components/NoResults";
 
 import './css/App.css';
 
+const PRODUCTS_PAGE_SIZE = 50;
+const SEARCH_DELAY = 300;  // ms to wait after the last keystroke before asking the server
+
+
 class App extends Component {
 
   constructor(props){
@@ -20,6 +24,9 @@ class App extends Component {
     this.state = {
       banners: [],  // null represent "Loading" state, will be replaced by Array on server response
       products: null,  // null represent "Loading" state, will be replaced by Array on server response
+      productsCursor: null,  // cursor of the next catalog page, null when all pages are loaded
+      productsLoading: false,
+      popularProducts: [],
       term: '',
       cart: [],
       quickViewProduct: null,  // will be replaced by selected product attributes
@@ -37,6 +44,9 @@ class App extends Component {
     this.handleCheckout=this.handleCheckout.bind(this);
     this.handleCheckoutModalShow=this.handleCheckoutModalShow.bind(this);
     this.handleCheckoutModalClose=this.handleCheckoutModalClose.bind(this);
+    this.handleLoadMoreProducts=this.handleLoadMoreProducts.bind(this);
+    this.searchProducts = _.debounce(this.searchProducts.bind(this), SEARCH_DELAY);
+    this.productsRequestId = 0;  // bumped on every new search to drop answers to the previous one
   }
 
   handleCheckoutModalShow(){
@@ -101,22 +111,75 @@ class App extends Component {
   }
 
 
-  async getProducts(){
-    let response = await fetch('/api/products/', {
+  async getProducts(cursor){
+    let requestId = this.productsRequestId;
+    let term = _.trim(this.state.term);
+    let url = `/api/products/?limit=${PRODUCTS_PAGE_SIZE}`;
+    if (term){
+      url += `&q=${encodeURIComponent(term)}`;
+    }
+    if (cursor){
+      url += `&cursor=${encodeURIComponent(cursor)}`;
+    }
+
+    this.setState({productsLoading: true});
+    let response = await fetch(url, {
       headers: {
         'Accept': 'application/json',
         'Content-Type': 'application/json',
       }
     });
 
+    if (requestId !== this.productsRequestId){
+      return;
+    }
+    this.setState({productsLoading: false});
+
     if (!response.ok){
       return;
     }
 
     let data = await response.json();
+    if (requestId !== this.productsRequestId){
+      return;
+    }
+    this.setState(state => ({
+      products : (state.products || []).concat(data.results),
+      productsCursor: data.next_cursor,
+    }));
+  }
+
+  searchProducts(){
+    this.productsRequestId += 1;
     this.setState({
-      products : data
+      products: null,
+      productsCursor: null,
     });
+    this.getProducts();
+  }
+
+  async getPopularProducts(){
+    let response = await fetch(`/api/products/?special=1&limit=${PRODUCTS_PAGE_SIZE}`, {
+      headers: {
+        'Accept': 'application/json',
+        'Content-Type': 'application/json',
+      }
+    });
+
+    if (!response.ok){
+      return;
+    }
+
+    let data = await response.json();
+    this.setState({
+      popularProducts: data.results,
+    });
+  }
+
+  handleLoadMoreProducts(){
+    if (this.state.productsCursor && !this.state.productsLoading){
+      this.getProducts(this.state.productsCursor);
+    }
   }
 
   async getBanners(){
@@ -139,13 +202,22 @@ class App extends Component {
 
   componentDidMount(){
     this.getProducts();
+    this.getPopularProducts();
     this.getBanners();
   }
 
+  componentWillUnmount(){
+    this.searchProducts.cancel();
+  }
+
 
   // Search by Keyword
   handleSearch(event){
+    let previousTerm = _.trim(this.state.term);
     this.setState({term: event.target.value});
+    if (_.trim(event.target.value) !== previousTerm){
+      this.searchProducts();
+    }
   }
 
   handleCartClose() {
@@ -215,15 +287,11 @@ class App extends Component {
     const totalAmount = this.state.cart.map(item => item.price * item.quantity).reduce((a,b) => a + b, 0);
 
     let menuBlocks = [];
-    let normalizedTerm = _.lowerCase(_.trim(this.state.term));
+    let normalizedTerm = _.trim(this.state.term);
 
     if (this.state.products){
-      let filteredProducts = this.state.products;
-
-      if (normalizedTerm){
-        filteredProducts = this.state.products.filter(product => !normalizedTerm || product.name.toLowerCase().includes(normalizedTerm));
-      } else {
-        let highlightedProducts = this.state.products.filter(x => x.special_status);
+      if (!normalizedTerm){
+        let highlightedProducts = this.state.popularProducts;
 
         if (highlightedProducts.length){
           menuBlocks.push(
@@ -243,7 +311,7 @@ class App extends Component {
         }
       }
 
-      let menuGroups = _.groupBy(filteredProducts, product => product.category && product.category.name || '');
+      let menuGroups = _.groupBy(this.state.products, product => product.category && product.category.name || '');
       menuBlocks.push(...Object.entries(menuGroups).map( ([groupName, products], index) => (
         <div style={{marginTop:"50px"}} className="form-group" key={index}>
           <center>
@@ -330,6 +398,18 @@ class App extends Component {
 
           { menuBlocks }
 
+          { this.state.productsCursor && (
+            <center>
+              <button
+                className="btn btn-default"
+                onClick={this.handleLoadMoreProducts}
+                disabled={this.state.productsLoading}
+              >
+                Показать ещё
+              </button>
+            </center>
+          )}
+
           <br/>
           <br/>
           <br/>
@@ -20,5 +20,6 @@ docker compose rm --force parcel
 
 docker compose exec -it web sh -c "python manage.py collectstatic --noinput"
 docker compose exec -it web sh -c "python manage.py migrate"
+docker compose exec -it web sh -c "python manage.py createcachetable"
 
 echo "All done!"
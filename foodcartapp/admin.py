@@ -7,8 +7,9 @@ from django.templatetags.static import static
 from django.utils.html import format_html
 from django.utils.http import url_has_allowed_host_and_scheme
 
+from addresses.models import GeocodeJob
 from star_burger import settings
-from .models import Product, Order, OrderItem
+from .models import Product, Order, OrderItem, OrderCandidate
 from .models import ProductCategory
 from .models import Restaurant
 from .models import RestaurantMenuItem
@@ -95,7 +96,7 @@ class ProductAdmin(admin.ModelAdmin):
             return 'выберите картинку'
         return format_html(
             '<img src="{url}" style="max-height: 200px;"/>',
-            url=obj.image.url
+            url=obj.get_image_url(400)
         )
     get_image_preview.short_description = 'превью'
 
@@ -106,7 +107,7 @@ class ProductAdmin(admin.ModelAdmin):
         return format_html(
             '<a href="{edit_url}"><img src="{src}" style="max-height: 50px;"/></a>',
             edit_url=edit_url,
-            src=obj.image.url
+            src=obj.get_image_url(100)
         )
     get_image_list_preview.short_description = 'превью'
 
@@ -143,8 +144,10 @@ class OrderAdmin(admin.ModelAdmin):
                     'lastname',
                     'firstname',
                     'phonenumber',
-                    'status'
+                    'status',
+                    'total'
                     )
+    readonly_fields = ('total',)
 
     @transaction.atomic
     def save_formset(self, request, form, formset, change):
@@ -165,6 +168,9 @@ class OrderAdmin(admin.ModelAdmin):
         formset.save_m2m()
         form_instance.save()
 
+        GeocodeJob.objects.enqueue(form_instance.address)
+        OrderCandidate.objects.refresh_for_orders([form_instance])
+
     def response_change(self, request, obj):
         res = super(OrderAdmin, self).response_change(request, obj)
 
@@ -190,23 +196,13 @@ class OrderAdmin(admin.ModelAdmin):
                 **kwargs
             )
 
-        order = Order.objects.prefetch_related('items__product').get(
+        order = Order.objects.prefetch_related('items').get(
             pk=request.resolver_match.kwargs.get('object_id')
         )
-        items_in_order = {
-            order_item.product.name for order_item in order.items.all()
-        }
-        restaurants = Restaurant.objects.prefetch_related(
-            'menu_items__product'
-        ).all()
-
-        restaurants_ids = []
-        for restaurant in restaurants:
-            restaurant_available_products = [
-                menu_item.product.name for menu_item in restaurant.menu_items.all() if menu_item.availability
-            ]
-            if items_in_order.issubset(restaurant_available_products):
-                restaurants_ids.append(restaurant.pk)
+        capability_index = RestaurantMenuItem.objects.capability_index()
+        restaurants_ids = capability_index.get_restaurant_ids(
+            order_item.product_id for order_item in order.items.all()
+        )
 
         selected_restaurant = Restaurant.objects.filter(id__in=restaurants_ids)
         kwargs["queryset"] = selected_restaurant
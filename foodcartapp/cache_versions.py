@@ -0,0 +1,20 @@
+import time
+
+from django.core.cache import cache
+
+
+def get_version_key(name):
+    return f'version:{name}'
+
+
+def get_version(name):
+    return cache.get_or_set(get_version_key(name), time.time_ns, timeout=None)
+
+
+def bump_version(name):
+    try:
+        return cache.incr(get_version_key(name))
+    except ValueError:
+        version = time.time_ns()
+        cache.set(get_version_key(name), version, timeout=None)
+        return version
@@ -0,0 +1,8 @@
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True, slots=True)
+class RestaurantCandidate:
+    restaurant_id: int
+    name: str
+    distance: int
@@ -0,0 +1,30 @@
+from collections import defaultdict
+
+
+class MenuCapabilityIndex:
+
+    def __init__(self, menu_items):
+        self.positions = {}
+        self.masks = defaultdict(int)
+        for restaurant_id, product_id in menu_items:
+            position = self.positions.setdefault(
+                product_id,
+                len(self.positions)
+            )
+            self.masks[restaurant_id] |= 1 << position
+
+    def get_products_mask(self, product_ids):
+        mask = 0
+        for product_id in product_ids:
+            mask |= 1 << self.positions.get(product_id, len(self.positions))
+        return mask
+
+    def can_cook(self, restaurant_id, products_mask):
+        return self.masks.get(restaurant_id, 0) & products_mask == products_mask
+
+    def get_restaurant_ids(self, product_ids):
+        products_mask = self.get_products_mask(product_ids)
+        return [
+            restaurant_id for restaurant_id, restaurant_mask in self.masks.items()
+            if restaurant_mask & products_mask == products_mask
+        ]
@@ -0,0 +1,375 @@
+import binascii
+import hashlib
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Optional, Tuple
+
+from django.contrib.postgres.aggregates import ArrayAgg
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+from django.db.models import Max, Q
+from django.utils import timezone
+from django.utils.encoding import filepath_to_uri
+
+from foodcartapp.cache_versions import bump_version, get_version
+from foodcartapp.models import (
+    CATALOG_VERSION,
+    CatalogChange,
+    Product,
+    ProductCategory,
+    RestaurantMenuItem,
+)
+from foodcartapp.responses import SUPPORTED_ENCODINGS, compress, dump_json
+from star_burger import settings
+
+
+CATALOG_MODIFIED_KEY = 'catalog:last_modified'
+
+
+PRODUCT_FIELDS = (
+    'id',
+    'name',
+    'price',
+    'special_status',
+    'description',
+    'category',
+    'image',
+    'srcset',
+    'restaurants',
+)
+
+
+@dataclass(frozen=True)
+class CatalogQuery:
+    category_id: Optional[int] = None
+    after_id: Optional[int] = None
+    limit: Optional[int] = None
+    fields: Optional[Tuple[str, ...]] = None
+    product_ids: Optional[Tuple[int, ...]] = None
+    search: Optional[str] = None
+    special: bool = False
+
+    @property
+    def cache_key(self):
+        fields = ','.join(self.fields) if self.fields else ''
+        product_ids = ','.join(map(str, self.product_ids or []))
+        return (
+            f'{self.category_id}:{self.after_id}:{self.limit}:{fields}:'
+            f'{product_ids}:{int(self.special)}'
+        )
+
+
+def encode_cursor(product_id):
+    return urlsafe_b64encode(str(product_id).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        padding = '=' * (-len(cursor) % 4)
+        return int(urlsafe_b64decode(cursor + padding).decode())
+    except (ValueError, binascii.Error):
+        raise ValueError('Invalid cursor')
+
+
+def parse_positive_int(value, name):
+    try:
+        number = int(value)
+    except ValueError:
+        raise ValueError(f'{name} must be an integer')
+    if number < 1:
+        raise ValueError(f'{name} must be positive')
+    return number
+
+
+def parse_catalog_query(params):
+    category_id = params.get('category')
+    if category_id:
+        category_id = parse_positive_int(category_id, 'category')
+
+    limit = params.get('limit')
+    cursor = params.get('cursor')
+    if limit:
+        limit = min(
+            parse_positive_int(limit, 'limit'),
+            settings.CATALOG_MAX_PAGE_SIZE
+        )
+    elif cursor:
+        limit = settings.CATALOG_PAGE_SIZE
+
+    fields = params.get('fields')
+    if fields:
+        fields = tuple(field.strip() for field in fields.split(','))
+        unknown_fields = set(fields) - set(PRODUCT_FIELDS)
+        if unknown_fields:
+            raise ValueError(
+                f'Unknown fields: {", ".join(sorted(unknown_fields))}'
+            )
+
+    return CatalogQuery(
+        category_id=category_id or None,
+        after_id=decode_cursor(cursor) if cursor else None,
+        limit=limit or None,
+        fields=fields or None,
+        search=params.get('q', '').strip() or None,
+        special=params.get('special') == '1',
+    )
+
+
+def get_restaurants_by_product(product_ids):
+    restaurants_by_product = defaultdict(list)
+    menu_items = RestaurantMenuItem.objects.filter(
+        availability=True,
+        product_id__in=product_ids
+    ).order_by('restaurant_id').values_list(
+        'product_id',
+        'restaurant_id',
+        'restaurant__name'
+    )
+    for product_id, restaurant_id, restaurant_name in menu_items:
+        restaurants_by_product[product_id].append(
+            {'id': restaurant_id, 'name': restaurant_name}
+        )
+    return restaurants_by_product
+
+
+def serialize_products(query=CatalogQuery()):
+    products = Product.objects.available().order_by('pk')
+    if query.category_id:
+        products = products.filter(category_id=query.category_id)
+    if query.after_id:
+        products = products.filter(pk__gt=query.after_id)
+    if query.product_ids is not None:
+        products = products.filter(pk__in=query.product_ids)
+    if query.search:
+        products = products.filter(name__icontains=query.search)
+    if query.special:
+        products = products.filter(special_status=True)
+
+    products = products.values(
+        'id',
+        'name',
+        'price',
+        'special_status',
+        'description',
+        'image',
+        'image_variants',
+        'category_id',
+        'category__name',
+    )
+
+    with_restaurants = not query.fields or 'restaurants' in query.fields
+    aggregate_restaurants = (
+        with_restaurants and connection.vendor == 'postgresql'
+    )
+    if aggregate_restaurants:
+        available_menu_items = Q(menu_items__availability=True)
+        products = products.annotate(
+            restaurant_ids=ArrayAgg(
+                'menu_items__restaurant_id',
+                filter=available_menu_items,
+                ordering='menu_items__restaurant_id',
+            ),
+            restaurant_names=ArrayAgg(
+                'menu_items__restaurant__name',
+                filter=available_menu_items,
+                ordering='menu_items__restaurant_id',
+            ),
+        )
+
+    if query.limit:
+        products = products[:query.limit]
+    products = list(products)
+
+    restaurants_by_product = None
+    if with_restaurants and not aggregate_restaurants:
+        restaurants_by_product = get_restaurants_by_product(
+            [product['id'] for product in products]
+        )
+
+    image_url_prefix = default_storage.url('')
+
+    dumped_products = []
+    for product in products:
+        if aggregate_restaurants:
+            restaurants = [
+                {'id': restaurant_id, 'name': restaurant_name}
+                for restaurant_id, restaurant_name in zip(
+                    product['restaurant_ids'] or [],
+                    product['restaurant_names'] or []
+                )
+            ]
+        elif with_restaurants:
+            restaurants = restaurants_by_product[product['id']]
+        else:
+            restaurants = None
+
+        dumped_product = {
+            'id': product['id'],
+            'name': product['name'],
+            'price': product['price'],
+            'special_status': product['special_status'],
+            'description': product['description'],
+            'category': {
+                'id': product['category_id'],
+                'name': product['category__name'],
+            } if product['category_id'] else None,
+            'image': image_url_prefix + filepath_to_uri(product['image']),
+            'srcset': [
+                {
+                    'url': image_url_prefix + filepath_to_uri(variant['name']),
+                    'width': variant['width'],
+                    'format': variant['format'],
+                }
+                for variant in product['image_variants'].get('variants', [])
+            ],
+            'restaurants': restaurants,
+        }
+        if query.fields:
+            dumped_product = {
+                field: dumped_product[field] for field in query.fields
+            }
+        dumped_products.append(dumped_product)
+    return dumped_products
+
+
+def paginate_products(query):
+    if not query.limit:
+        return serialize_products(query)
+
+    products = serialize_products(
+        CatalogQuery(
+            category_id=query.category_id,
+            after_id=query.after_id,
+            limit=query.limit + 1,
+            fields=tuple(
+                dict.fromkeys(('id', ) + query.fields)
+            ) if query.fields else None,
+            search=query.search,
+            special=query.special,
+        )
+    )
+    has_next_page = len(products) > query.limit
+    products = products[:query.limit]
+    next_cursor = encode_cursor(products[-1]['id']) if has_next_page else None
+    if query.fields and 'id' not in query.fields:
+        products = [
+            {field: product[field] for field in query.fields}
+            for product in products
+        ]
+    return {
+        'results': products,
+        'next_cursor': next_cursor,
+    }
+
+
+def get_latest_change_version():
+    committed_before = timezone.now() - timedelta(
+        seconds=settings.CATALOG_CHANGES_LAG
+    )
+    return CatalogChange.objects.filter(
+        created_at__lt=committed_before
+    ).aggregate(version=Max('pk'))['version'] or 0
+
+
+def is_change_version_expired(since):
+    first_change_id = CatalogChange.objects.order_by('pk').values_list(
+        'pk',
+        flat=True
+    ).first()
+    return first_change_id is not None and since < first_change_id - 1
+
+
+def get_catalog_changes(since):
+    version = max(get_latest_change_version(), since)
+    product_ids = set(
+        CatalogChange.objects.filter(pk__gt=since)
+        .values_list('product_id', flat=True)
+    )
+    upserts = serialize_products(
+        CatalogQuery(product_ids=tuple(sorted(product_ids)))
+    ) if product_ids else []
+    return {
+        'version': version,
+        'upserts': upserts,
+        'deletions': sorted(
+            product_ids - {product['id'] for product in upserts}
+        ),
+    }
+
+
+def log_catalog_changes(product_ids):
+    CatalogChange.objects.bulk_create([
+        CatalogChange(product_id=product_id) for product_id in product_ids
+    ])
+
+
+def build_catalog(query=CatalogQuery(), encodings=SUPPORTED_ENCODINGS):
+    change_version = get_latest_change_version()
+    content = dump_json(paginate_products(query))
+    return {
+        'encoded_contents': compress(content, encodings),
+        'change_version': change_version,
+        'etag': hashlib.sha256(content).hexdigest(),
+        'last_modified': cache.get_or_set(
+            CATALOG_MODIFIED_KEY,
+            timezone.now,
+            timeout=None
+        ),
+    }
+
+
+def get_catalog_ids():
+    key = f'catalog_ids:{get_version(CATALOG_VERSION)}'
+    catalog_ids = cache.get(key)
+    if catalog_ids is None:
+        catalog_ids = {
+            'categories': frozenset(
+                ProductCategory.objects.values_list('pk', flat=True)
+            ),
+            'products': frozenset(
+                Product.objects.values_list('pk', flat=True)
+            ),
+        }
+        cache.set(key, catalog_ids, timeout=settings.CATALOG_CACHE_TIMEOUT)
+    return catalog_ids
+
+
+def is_cacheable(query):
+    if query.fields or query.search or query.product_ids is not None:
+        return False
+    if query.limit not in (None, settings.CATALOG_PAGE_SIZE):
+        return False
+    if not query.category_id and not query.after_id:
+        return True
+
+    catalog_ids = get_catalog_ids()
+    category_ids = catalog_ids['categories']
+    if query.category_id and query.category_id not in category_ids:
+        return False
+    if query.after_id and query.after_id not in catalog_ids['products']:
+        return False
+    return True
+
+
+def get_catalog(query=CatalogQuery(), encodings=SUPPORTED_ENCODINGS):
+    if not is_cacheable(query):
+        return build_catalog(query, encodings)
+
+    key = f'catalog:{get_version(CATALOG_VERSION)}:{query.cache_key}'
+    catalog = cache.get(key)
+    if catalog is None:
+        catalog = build_catalog(query)
+        cache.set(key, catalog, timeout=settings.CATALOG_CACHE_TIMEOUT)
+    return catalog
+
+
+def bump_catalog_version():
+    cache.set(CATALOG_MODIFIED_KEY, timezone.now(), timeout=None)
+    bump_version(CATALOG_VERSION)
+
+
+def invalidate_catalog():
+    transaction.on_commit(bump_catalog_version)
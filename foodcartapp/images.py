@@ -0,0 +1,99 @@
+import logging
+import os
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from star_burger import settings
+
+
+logger = logging.getLogger(__name__)
+
+IMAGE_VARIANT_FORMATS = [
+    ('webp', 'WEBP'),
+    ('jpg', 'JPEG'),
+]
+
+
+def open_image(image_field):
+    with image_field.open('rb') as image_file:
+        image = Image.open(image_file)
+        image.load()
+    return ImageOps.exif_transpose(image).convert('RGB')
+
+
+def generate_image_variants(image_field):
+    image = open_image(image_field)
+    base_name, _ = os.path.splitext(image_field.name)
+    widths = sorted({
+        min(width, image.width) for width in settings.PRODUCT_IMAGE_WIDTHS
+    })
+
+    variants = []
+    for width in widths:
+        resized_image = image.copy()
+        resized_image.thumbnail(
+            (width, image.height),
+            Image.Resampling.LANCZOS
+        )
+        for extension, image_format in IMAGE_VARIANT_FORMATS:
+            name = f'variants/{base_name}-{width}w.{extension}'
+            content = BytesIO()
+            resized_image.save(
+                content,
+                image_format,
+                quality=settings.PRODUCT_IMAGE_QUALITY
+            )
+            if default_storage.exists(name):
+                default_storage.delete(name)
+            variants.append({
+                'name': default_storage.save(
+                    name,
+                    ContentFile(content.getvalue())
+                ),
+                'width': resized_image.width,
+                'format': extension,
+            })
+    return variants
+
+
+def delete_image_variants(image_variants, keep=()):
+    for variant in image_variants.get('variants', []):
+        if variant['name'] not in keep:
+            default_storage.delete(variant['name'])
+
+
+def update_image_variants(product, force=False):
+    old_variants = product.image_variants
+    if not product.image:
+        variants = {}
+    elif (
+        not force
+        and product.image_variants.get('source') == product.image.name
+    ):
+        return False
+    else:
+        try:
+            variants = {
+                'source': product.image.name,
+                'variants': generate_image_variants(product.image),
+            }
+        except (OSError, UnidentifiedImageError) as error:
+            logger.warning(
+                'Не удалось сделать варианты картинки %s: %s',
+                product.image.name,
+                error
+            )
+            variants = {}
+
+    product.image_variants = variants
+    type(product).objects.filter(pk=product.pk).update(
+        image_variants=variants
+    )
+    delete_image_variants(
+        old_variants,
+        keep={variant['name'] for variant in variants.get('variants', [])}
+    )
+    return bool(variants)
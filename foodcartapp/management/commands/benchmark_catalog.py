@@ -0,0 +1,92 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from foodcartapp.catalog import build_catalog, serialize_products
+from foodcartapp.models import (
+    Product,
+    ProductCategory,
+    Restaurant,
+    RestaurantMenuItem,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет сборку каталога /api/products/ на синтетических товарах. '
+        'Данные создаются в транзакции и откатываются'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=5000)
+        parser.add_argument('--restaurants', type=int, default=20)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def create_data(self, options):
+        categories = [
+            ProductCategory.objects.create(name=f'Бенчмарк {number}')
+            for number in range(10)
+        ]
+        Product.objects.bulk_create([
+            Product(
+                name=f'Бенчмарк {number}',
+                price=100 + number % 500,
+                image=f'benchmark/{number}.jpg',
+                category=categories[number % len(categories)],
+                description='Описание товара для бенчмарка',
+            )
+            for number in range(options['products'])
+        ])
+        products = Product.objects.filter(name__startswith='Бенчмарк ')
+        Restaurant.objects.bulk_create([
+            Restaurant(name=f'Бенчмарк {number}')
+            for number in range(options['restaurants'])
+        ])
+        restaurants = Restaurant.objects.filter(name__startswith='Бенчмарк ')
+        RestaurantMenuItem.objects.bulk_create([
+            RestaurantMenuItem(
+                restaurant=restaurant,
+                product=product,
+                availability=(product.pk + restaurant.pk) % 3 != 0
+            )
+            for restaurant in restaurants
+            for product in products
+        ])
+
+    def measure(self, function, repeat):
+        timings = []
+        for _ in range(repeat):
+            with CaptureQueriesContext(connection) as queries:
+                started_at = time.perf_counter()
+                result = function()
+                timings.append(time.perf_counter() - started_at)
+        return result, min(timings), len(queries)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            self.create_data(options)
+
+            products, elapsed, queries = self.measure(
+                serialize_products,
+                options['repeat']
+            )
+            self.stdout.write(
+                f'serialize_products: товаров {len(products)}, '
+                f'{elapsed * 1000:.0f} мс, запросов {queries}'
+            )
+
+            catalog, elapsed, queries = self.measure(
+                build_catalog,
+                options['repeat']
+            )
+            sizes = ', '.join(
+                f'{encoding} {len(content) / 1024:.0f} КиБ'
+                for encoding, content in catalog['encoded_contents'].items()
+            )
+            self.stdout.write(
+                f'build_catalog: {elapsed * 1000:.0f} мс, '
+                f'запросов {queries}, размер: {sizes}'
+            )
+            transaction.set_rollback(True)
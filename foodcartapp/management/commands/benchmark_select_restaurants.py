@@ -0,0 +1,121 @@
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from addresses.geocoders import hash_coordinates
+from addresses.models import Place
+from addresses.normalization import normalize_address
+from foodcartapp.cache_versions import bump_version
+from foodcartapp.models import (
+    Order,
+    OrderItem,
+    Product,
+    Restaurant,
+    RestaurantMenuItem,
+)
+from foodcartapp.restaurant_index import RestaurantLocator
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет время и память select_restaurants на синтетических '
+        'заказах. Данные создаются в транзакции и откатываются'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--orders', type=int, default=10000)
+        parser.add_argument('--restaurants', type=int, default=50)
+        parser.add_argument('--products', type=int, default=30)
+        parser.add_argument('--items-per-order', type=int, default=3)
+
+    def create_places(self, addresses):
+        Place.objects.bulk_create(
+            [
+                Place(
+                    address=address,
+                    normalized_address=normalize_address(address),
+                    lat=hash_coordinates(address)[0],
+                    lon=hash_coordinates(address)[1],
+                )
+                for address in addresses
+            ],
+            ignore_conflicts=True
+        )
+
+    def create_data(self, options):
+        Product.objects.bulk_create([
+            Product(name=f'Бенчмарк {number}', price=100, image='benchmark.jpg')
+            for number in range(options['products'])
+        ])
+        products = list(Product.objects.filter(name__startswith='Бенчмарк '))
+
+        Restaurant.objects.bulk_create([
+            Restaurant(
+                name=f'Бенчмарк {number}',
+                address=f'Москва, бенчмарк ресторан {number}'
+            )
+            for number in range(options['restaurants'])
+        ])
+        restaurants = list(
+            Restaurant.objects.filter(name__startswith='Бенчмарк ')
+        )
+        self.create_places(restaurant.address for restaurant in restaurants)
+        RestaurantMenuItem.objects.bulk_create([
+            RestaurantMenuItem(restaurant=restaurant, product=product)
+            for restaurant_number, restaurant in enumerate(restaurants)
+            for product_number, product in enumerate(products)
+            if (restaurant_number + product_number) % 4
+        ])
+
+        Order.objects.bulk_create([
+            Order(
+                firstname='Бенчмарк',
+                lastname=str(number),
+                phonenumber='+79990000000',
+                address=f'Москва, бенчмарк заказ {number}'
+            )
+            for number in range(options['orders'])
+        ])
+        orders = list(Order.objects.filter(firstname='Бенчмарк'))
+        self.create_places(order.address for order in orders)
+        OrderItem.objects.bulk_create([
+            OrderItem(
+                order=order,
+                product=products[(order.pk + item) % len(products)],
+                quantity=1,
+                price=100
+            )
+            for order in orders
+            for item in range(options['items_per_order'])
+        ])
+        bump_version(RestaurantLocator.version_name)
+        return [order.pk for order in orders]
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            order_ids = self.create_data(options)
+
+            tracemalloc.start()
+            started_at = time.perf_counter()
+            orders = list(
+                Order.objects.filter(pk__in=order_ids)
+                .prefetch_related('items').select_restaurants()
+            )
+            elapsed = time.perf_counter() - started_at
+            _, peak = tracemalloc.get_traced_memory()
+            snapshot_size = sum(
+                stat.size for stat in
+                tracemalloc.take_snapshot().statistics('filename')
+            )
+            tracemalloc.stop()
+
+            candidates = sum(len(order.available_restaurants) for order in orders)
+            self.stdout.write(
+                f'Заказов: {len(orders)}, кандидатов: {candidates}, '
+                f'время: {elapsed:.2f} с, '
+                f'память после: {snapshot_size / 2 ** 20:.1f} МиБ, '
+                f'пик: {peak / 2 ** 20:.1f} МиБ'
+            )
+            transaction.set_rollback(True)
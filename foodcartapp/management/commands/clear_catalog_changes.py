@@ -0,0 +1,27 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from foodcartapp.models import CatalogChange
+
+
+class Command(BaseCommand):
+    help = 'Удаляет старые записи ленты изменений каталога'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--hours',
+            type=int,
+            default=7 * 24,
+            help='Сколько часов хранить изменения',
+        )
+
+    def handle(self, *args, **options):
+        latest_change = CatalogChange.objects.order_by('-pk').first()
+        if latest_change is None:
+            return
+        deleted, _ = CatalogChange.objects.filter(
+            created_at__lt=timezone.now() - timedelta(hours=options['hours'])
+        ).exclude(pk=latest_change.pk).delete()
+        self.stdout.write(f'Удалено изменений: {deleted}')
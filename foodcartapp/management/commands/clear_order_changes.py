@@ -0,0 +1,24 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from foodcartapp.models import OrderChange
+
+
+class Command(BaseCommand):
+    help = 'Удаляет старые записи ленты изменений заказов'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--hours',
+            type=int,
+            default=24,
+            help='Сколько часов хранить изменения',
+        )
+
+    def handle(self, *args, **options):
+        deleted, _ = OrderChange.objects.filter(
+            created_at__lt=timezone.now() - timedelta(hours=options['hours'])
+        ).delete()
+        self.stdout.write(f'Удалено изменений: {deleted}')
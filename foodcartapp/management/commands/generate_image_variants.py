@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from foodcartapp.catalog import invalidate_catalog, log_catalog_changes
+from foodcartapp.images import update_image_variants
+from foodcartapp.models import Product
+
+
+class Command(BaseCommand):
+    help = 'Генерирует уменьшенные WebP/JPEG варианты картинок товаров'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Пересоздать варианты, даже если они уже есть',
+        )
+
+    def handle(self, *args, **options):
+        product_ids = []
+        products = Product.objects.exclude(image='').order_by('pk')
+        for product in products.iterator():
+            if update_image_variants(product, force=options['force']):
+                product_ids.append(product.pk)
+        if product_ids:
+            log_catalog_changes(product_ids)
+            invalidate_catalog()
+        self.stdout.write(f'Картинок обработано: {len(product_ids)}')
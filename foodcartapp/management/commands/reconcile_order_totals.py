@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from foodcartapp.models import Order
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает сохранённые суммы заказов по их позициям'
+
+    def handle(self, *args, **options):
+        drifted_orders = Order.objects.reconcile_totals()
+        for order in drifted_orders:
+            self.stdout.write(f'Заказ {order.pk}: сумма исправлена на {order.total}')
+        self.stdout.write(f'Исправлено заказов: {len(drifted_orders)}')
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from foodcartapp.models import Order, OrderCandidate
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает рестораны-кандидаты для всех невыполненных заказов'
+
+    def handle(self, *args, **options):
+        candidates = OrderCandidate.objects.refresh_for_orders(
+            Order.objects.exclude(status='CO')
+        )
+        self.stdout.write(f'Сохранено кандидатов: {len(candidates)}')
@@ -0,0 +1,35 @@
+# Generated by Django 3.2.15 on 2026-10-18 04:47
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodcartapp', '0070_alter_orderitem_product'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderCandidate',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('distance', models.PositiveIntegerField(verbose_name='Расстояние, км')),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='candidates', to='foodcartapp.order', verbose_name='Заказ')),
+                ('restaurant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='order_candidates', to='foodcartapp.restaurant', verbose_name='Ресторан')),
+            ],
+            options={
+                'verbose_name': 'Ресторан-кандидат для заказа',
+                'verbose_name_plural': 'Рестораны-кандидаты для заказов',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='ordercandidate',
+            index=models.Index(fields=['order', 'distance'], name='foodcartapp_order_i_fb7ebc_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='ordercandidate',
+            unique_together={('order', 'restaurant')},
+        ),
+    ]
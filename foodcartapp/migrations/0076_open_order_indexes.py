@@ -0,0 +1,25 @@
+# Generated by Django 3.2.15 on 2026-10-18 05:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodcartapp', '0075_order_total'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(condition=models.Q(('status', 'CO'), _negated=True), fields=['-id'], name='open_order_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(condition=models.Q(('status', 'CO'), _negated=True), fields=['status', '-id'], name='open_order_status_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(condition=models.Q(('status', 'CO'), _negated=True), fields=['production_restaurant', '-id'], name='open_order_restaurant_id_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 3.2.15 on 2026-10-18 05:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodcartapp', '0077_orderchange'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='revision',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Версия заказа'),
+        ),
+    ]
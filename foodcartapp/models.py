@@ -1,14 +1,22 @@
-from geopy import distance
-from operator import itemgetter
-from django.db import models
+from operator import attrgetter
+from datetime import timedelta
+from decimal import Decimal
+from django.core.cache import cache
+from django.db import models, transaction
+from django.core.files.storage import default_storage
 from django.core.validators import MinValueValidator
-from django.db.models import F, Sum
+from django.db.models import F, Max, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
 from django.utils import timezone
 from phonenumber_field.modelfields import PhoneNumberField
 
+from addresses.distances import get_distance_matrix
 from addresses.models import Place
-from foodcartapp.serializer import restaurants_serializer
-from addresses.yandex_geo_api import fetch_coordinates
+from addresses.normalization import normalize_address
+from foodcartapp.cache_versions import bump_version, get_version
+from foodcartapp.candidates import RestaurantCandidate
+from foodcartapp.capabilities import MenuCapabilityIndex
+from foodcartapp.restaurant_index import restaurant_locator
 from star_burger import settings
 
 
@@ -82,6 +90,12 @@ class Product(models.Model):
     image = models.ImageField(
         'картинка'
     )
+    image_variants = models.JSONField(
+        'варианты картинки',
+        default=dict,
+        blank=True,
+        editable=False,
+    )
     special_status = models.BooleanField(
         'спец.предложение',
         default=False,
@@ -102,6 +116,120 @@ class Product(models.Model):
     def __str__(self):
         return self.name
 
+    def get_image_url(self, min_width, image_format='jpg'):
+        variants = sorted(
+            (
+                variant for variant in self.image_variants.get('variants', [])
+                if variant['format'] == image_format
+            ),
+            key=lambda variant: variant['width']
+        )
+        for variant in variants:
+            if variant['width'] >= min_width:
+                return default_storage.url(variant['name'])
+        if variants:
+            return default_storage.url(variants[-1]['name'])
+        return self.image.url
+
+
+class CatalogChange(models.Model):
+    product_id = models.IntegerField('ID товара', db_index=True)
+    created_at = models.DateTimeField(
+        'Время изменения',
+        default=timezone.now
+    )
+
+    class Meta:
+        verbose_name = 'Изменение каталога'
+        verbose_name_plural = 'Изменения каталога'
+
+    def __str__(self):
+        return f'{self.pk}: {self.product_id}'
+
+
+CATALOG_VERSION = 'catalog'
+CANDIDATES_VERSION = 'order_candidates'
+
+
+class OrderChangeQuerySet(models.QuerySet):
+
+    def log(self, order_ids):
+        return self.bulk_create([
+            OrderChange(order_id=order_id) for order_id in set(order_ids)
+        ])
+
+    def get_latest_id(self):
+        return self.aggregate(latest_id=Max('pk'))['latest_id'] or 0
+
+    def get_committed_id(self):
+        committed_before = timezone.now() - timedelta(
+            seconds=settings.ORDER_CHANGES_LAG
+        )
+        return self.filter(created_at__lt=committed_before).get_latest_id()
+
+    def get_cursor(self):
+        committed_id = self.get_committed_id()
+        change_ids = set(
+            self.filter(pk__gt=committed_id).values_list('pk', flat=True)
+        )
+        latest_id = max(change_ids, default=committed_id)
+        missing_ids = set(range(committed_id + 1, latest_id + 1)) - change_ids
+        return latest_id, missing_ids
+
+    def read(self, last_change_id, missing_ids, limit):
+        committed_id = self.get_committed_id()
+        changes = list(
+            self.filter(Q(pk__gt=last_change_id) | Q(pk__in=missing_ids))
+            .order_by('pk').values_list('pk', 'order_id')[:limit]
+        )
+        change_ids = {change_id for change_id, _ in changes}
+        latest_id = max(change_ids | {last_change_id})
+        missing_ids = (
+            set(missing_ids)
+            | set(range(max(last_change_id, committed_id) + 1, latest_id + 1))
+        ) - change_ids
+        return changes, latest_id, {
+            change_id for change_id in missing_ids if change_id > committed_id
+        }
+
+
+class OrderChange(models.Model):
+    order_id = models.IntegerField('ID заказа')
+    created_at = models.DateTimeField(
+        'Время изменения',
+        default=timezone.now,
+        db_index=True
+    )
+
+    objects = OrderChangeQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = 'Изменение заказа'
+        verbose_name_plural = 'Изменения заказов'
+
+    def __str__(self):
+        return f'{self.pk}: {self.order_id}'
+
+
+class RestaurantMenuItemQuerySet(models.QuerySet):
+    def build_capability_index(self):
+        return MenuCapabilityIndex(
+            self.filter(availability=True)
+            .order_by('product').values_list('restaurant', 'product')
+        )
+
+    def capability_index(self):
+        key = f'capability_index:{get_version(CATALOG_VERSION)}'
+        capability_index = cache.get(key)
+        if capability_index is None:
+            capability_index = self.build_capability_index()
+            cache.set(
+                key,
+                capability_index,
+                timeout=settings.CATALOG_CACHE_TIMEOUT
+            )
+        return capability_index
+
 
 class RestaurantMenuItem(models.Model):
     restaurant = models.ForeignKey(
@@ -122,6 +250,8 @@ class RestaurantMenuItem(models.Model):
         db_index=True
     )
 
+    objects = RestaurantMenuItemQuerySet.as_manager()
+
     class Meta:
         verbose_name = 'пункт меню ресторана'
         verbose_name_plural = 'пункты меню ресторана'
@@ -158,79 +288,131 @@ class OrderItem(models.Model):
         blank=True
     )
 
+    loaded_cost = (None, 0)
+
     class Meta:
         verbose_name = 'Элемент заказа'
         verbose_name_plural = 'Элементы заказа'
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if {'order_id', 'quantity', 'price'} <= set(field_names):
+            instance.loaded_cost = (instance.order_id, instance.get_cost())
+        return instance
+
     def clean(self):
         if self.price is None:
             self.price = self.product.price
 
+    def get_cost(self):
+        return self.quantity * (self.price or 0)
+
 
 class OrderQuerySet(models.QuerySet):
 
-    def get_amount(self):
-        return self.annotate(
-            total=Sum(F('items__quantity') * F('items__price'))
-        )
+    def add_to_total(self, order_id, amount):
+        if amount:
+            self.filter(pk=order_id).update(total=F('total') + amount)
 
-    def select_restaurants(self):
+    def touch(self):
+        return self.update(revision=F('revision') + 1)
 
-        restaurants = Restaurant.objects.prefetch_related(
-            'menu_items__product'
-        ).prefetch_related('orders')
-        serialized_restaurants = [
-            restaurants_serializer(restaurant) for restaurant in restaurants
-        ]
+    def with_items_total(self):
+        items_total = OrderItem.objects.filter(order=OuterRef('pk')).\
+            values('order').annotate(
+                total=Sum(
+                    F('quantity') * F('price'),
+                    output_field=models.DecimalField()
+                )
+            ).values('total')
+        return self.annotate(
+            items_total=Coalesce(
+                Subquery(items_total),
+                Value(Decimal(0)),
+                output_field=models.DecimalField()
+            )
+        )
 
-        places = Place.objects.filter(
-            address__in=[restaurant['address'] for restaurant in serialized_restaurants]+[order.address for order in self]
+    def reconcile_totals(self):
+        drifted_orders = list(
+            self.with_items_total().exclude(total=F('items_total'))
         )
+        for order in drifted_orders:
+            order.total = order.items_total
+        self.bulk_update(drifted_orders, ['total'])
+        drifted_order_ids = [order.pk for order in drifted_orders]
+        self.filter(pk__in=drifted_order_ids).touch()
+        OrderChange.objects.log(drifted_order_ids)
+        return drifted_orders
+
+    def get_coordinates(self):
+        places = Place.objects.for_addresses(
+            [order.address for order in self]
+        )
+        coordinates = {
+            place.normalized_address: place.get_coordinates()
+            for place in places if place.get_coordinates()
+        }
+        geocoded_addresses = {place.normalized_address for place in places}
 
         for order in self:
-            available_restaurants = []
-            items_in_order = {
-                order_item.product.name for order_item in order.items.all()
-            }
-            for restaurant in serialized_restaurants:
-                if not items_in_order.issubset(
-                    restaurant['available_products']
-                ):
-                    continue
+            normalized_address = normalize_address(order.address)
+            order.coordinates = coordinates.get(normalized_address)
+            order.coordinates_pending = (
+                normalized_address not in geocoded_addresses
+            )
+            order.address_not_found = (
+                not order.coordinates_pending
+                and not order.coordinates
+            )
 
-                order_place = list(
-                    filter(
-                        lambda place: (place.address == order.address),
-                        places
-                    )
-                )
-                order_place = order_place[0]
-
-                restaurant_place = list(
-                    filter(
-                        lambda place: (
-                            place.address == restaurant['address']
-                        ),
-                        places
-                    )
-                )
+        return self
 
-                restaurant['distance'] = int(
-                    distance.distance(
-                        order_place.get_coordinates(),
-                        restaurant_place[0].get_coordinates()
-                    ).km
-                )
-                available_restaurants.append(restaurant)
+    def select_restaurants(self):
+
+        restaurant_names = dict(Restaurant.objects.values_list('id', 'name'))
+        capability_index = RestaurantMenuItem.objects.capability_index()
 
+        for order in self.get_coordinates():
+            order.available_restaurants = []
+            if not order.coordinates:
+                continue
+
+            products_mask = capability_index.get_products_mask(
+                order_item.product_id for order_item in order.items.all()
+            )
+            nearby_restaurants = restaurant_locator.within(
+                *order.coordinates,
+                settings.RESTAURANT_SEARCH_RADIUS_KM
+            )
             order.available_restaurants = sorted(
-                available_restaurants,
-                key=itemgetter('distance'),
+                (
+                    RestaurantCandidate(
+                        restaurant_id=restaurant_id,
+                        name=restaurant_names[restaurant_id],
+                        distance=int(restaurant_distance),
+                    )
+                    for restaurant_id, restaurant_distance in nearby_restaurants
+                    if restaurant_id in restaurant_names
+                    and capability_index.can_cook(restaurant_id, products_mask)
+                ),
+                key=attrgetter('distance'),
                 reverse=True
             )
 
         return self
 
+    def with_candidates(self):
+        return self.prefetch_related(
+            models.Prefetch(
+                'candidates',
+                queryset=OrderCandidate.objects.select_related(
+                    'restaurant'
+                ).order_by('-distance')
+            )
+        )
+
 
 class Order(models.Model):
     ORDER_STATUS_CHOICES = [
@@ -290,13 +472,231 @@ class Order(models.Model):
         blank=True,
         null=True
     )
+    total = models.DecimalField(
+        'Сумма заказа',
+        max_digits=10,
+        decimal_places=2,
+        default=0,
+        editable=False
+    )
+    revision = models.PositiveIntegerField(
+        'Версия заказа',
+        default=0,
+        editable=False
+    )
 
     objects = OrderQuerySet.as_manager()
 
     class Meta:
         verbose_name = 'Заказ'
         verbose_name_plural = 'Заказы'
+        indexes = [
+            models.Index(
+                fields=['-id'],
+                condition=~Q(status='CO'),
+                name='open_order_id_idx'
+            ),
+            models.Index(
+                fields=['status', '-id'],
+                condition=~Q(status='CO'),
+                name='open_order_status_id_idx'
+            ),
+            models.Index(
+                fields=['production_restaurant', '-id'],
+                condition=~Q(status='CO'),
+                name='open_order_restaurant_id_idx'
+            ),
+        ]
 
     def __str__(self):
         return f'{self.firstname} {self.lastname} ({str(self.phonenumber)})'
 
+    def save(self, *args, **kwargs):
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in ('total', 'revision')
+            ]
+        super().save(*args, **kwargs)
+
+
+class OrderCandidateQuerySet(models.QuerySet):
+
+    @transaction.atomic
+    def refresh_for_orders(self, orders):
+        orders = Order.objects.filter(
+            pk__in=[order.pk for order in orders]
+        ).prefetch_related('items').select_restaurants()
+
+        self.filter(order__in=orders).delete()
+        Order.objects.filter(pk__in=[order.pk for order in orders]).touch()
+        OrderChange.objects.log(order.pk for order in orders)
+        return self.bulk_create([
+            OrderCandidate(
+                order=order,
+                restaurant_id=candidate.restaurant_id,
+                distance=candidate.distance
+            )
+            for order in orders
+            for candidate in order.available_restaurants
+        ])
+
+    @transaction.atomic
+    def refresh_for_restaurants(self, restaurant_ids):
+        restaurant_ids = sorted(set(restaurant_ids))
+        stale_candidates = self.filter(restaurant_id__in=restaurant_ids)
+        changed_order_ids = set(
+            stale_candidates.values_list('order_id', flat=True)
+        )
+        stale_candidates.delete()
+        transaction.on_commit(lambda: bump_version(CANDIDATES_VERSION))
+
+        restaurant_coordinates = {
+            restaurant_id: restaurant_locator.get_coordinates(restaurant_id)
+            for restaurant_id in restaurant_ids
+        }
+        restaurant_ids = [
+            restaurant_id for restaurant_id in restaurant_ids
+            if restaurant_coordinates[restaurant_id]
+        ]
+        if not restaurant_ids:
+            Order.objects.filter(pk__in=changed_order_ids).touch()
+            OrderChange.objects.log(changed_order_ids)
+            return []
+
+        capability_index = RestaurantMenuItem.objects.build_capability_index()
+        orders = [
+            order for order in Order.objects.exclude(status='CO')
+            .prefetch_related('items').get_coordinates()
+            if order.coordinates
+        ]
+        distances = get_distance_matrix(
+            [
+                restaurant_coordinates[restaurant_id]
+                for restaurant_id in restaurant_ids
+            ],
+            [order.coordinates for order in orders]
+        )
+
+        candidates = []
+        for order_number, order in enumerate(orders):
+            products_mask = capability_index.get_products_mask(
+                order_item.product_id for order_item in order.items.all()
+            )
+            for restaurant_number, restaurant_id in enumerate(restaurant_ids):
+                order_distance = distances[restaurant_number][order_number]
+                if (
+                    order_distance <= settings.RESTAURANT_SEARCH_RADIUS_KM
+                    and capability_index.can_cook(restaurant_id, products_mask)
+                ):
+                    candidates.append(OrderCandidate(
+                        order=order,
+                        restaurant_id=restaurant_id,
+                        distance=int(order_distance)
+                    ))
+
+        candidates = self.bulk_create(candidates)
+        changed_order_ids |= {candidate.order_id for candidate in candidates}
+        Order.objects.filter(pk__in=changed_order_ids).touch()
+        OrderChange.objects.log(changed_order_ids)
+        return candidates
+
+    def refresh_for_restaurant(self, restaurant_id):
+        return self.refresh_for_restaurants([restaurant_id])
+
+
+class OrderCandidate(models.Model):
+    order = models.ForeignKey(
+        Order,
+        on_delete=models.CASCADE,
+        related_name='candidates',
+        verbose_name='Заказ'
+    )
+    restaurant = models.ForeignKey(
+        Restaurant,
+        on_delete=models.CASCADE,
+        related_name='order_candidates',
+        verbose_name='Ресторан'
+    )
+    distance = models.PositiveIntegerField('Расстояние, км')
+
+    objects = OrderCandidateQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = 'Ресторан-кандидат для заказа'
+        verbose_name_plural = 'Рестораны-кандидаты для заказов'
+        unique_together = [
+            ['order', 'restaurant']
+        ]
+        indexes = [
+            models.Index(fields=['order', 'distance'])
+        ]
+
+    def __str__(self):
+        return f'{self.order_id} - {self.restaurant_id}: {self.distance} км'
+
+
+class IdempotencyKeyQuerySet(models.QuerySet):
+
+    def expired(self):
+        return self.filter(
+            created_at__lt=timezone.now() - IdempotencyKey.get_ttl()
+        )
+
+    def claim(self, key, request_hash):
+        idempotency_key, created = self.select_for_update().get_or_create(
+            key=key,
+            defaults={'request_hash': request_hash}
+        )
+        if created:
+            return idempotency_key
+
+        if idempotency_key.is_expired():
+            idempotency_key.request_hash = request_hash
+            idempotency_key.status_code = None
+            idempotency_key.response = None
+            idempotency_key.created_at = timezone.now()
+            idempotency_key.save()
+        elif idempotency_key.request_hash != request_hash:
+            raise ValueError(
+                'Idempotency-Key is already used with another request'
+            )
+        return idempotency_key
+
+
+class IdempotencyKey(models.Model):
+    key = models.CharField('Ключ', max_length=255, unique=True)
+    request_hash = models.CharField('Хэш запроса', max_length=64)
+    status_code = models.PositiveSmallIntegerField(
+        'Код ответа',
+        null=True,
+        blank=True
+    )
+    response = models.JSONField('Ответ', null=True, blank=True)
+    created_at = models.DateTimeField(
+        'Время запроса',
+        default=timezone.now,
+        db_index=True
+    )
+
+    objects = IdempotencyKeyQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = 'Ключ идемпотентности'
+        verbose_name_plural = 'Ключи идемпотентности'
+
+    def __str__(self):
+        return self.key
+
+    @staticmethod
+    def get_ttl():
+        return timedelta(hours=settings.IDEMPOTENCY_KEY_TTL_HOURS)
+
+    def is_expired(self):
+        return timezone.now() - self.created_at > self.get_ttl()
+
+    def store_response(self, response):
+        self.status_code = response.status_code
+        self.response = response.data
+        self.save(update_fields=['status_code', 'response'])
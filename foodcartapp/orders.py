@@ -0,0 +1,93 @@
+from django.db import connection
+
+from addresses.models import GeocodeJob
+from foodcartapp.models import Order, OrderCandidate, OrderItem, Product
+
+
+def resolve_prices(product_ids):
+    return dict(
+        Product.objects.filter(pk__in=set(product_ids))
+        .values_list('pk', 'price')
+    )
+
+
+def build_order_items(products, prices):
+    if not products:
+        raise ValueError('Products is empty')
+
+    unknown_ids = sorted({
+        item['product'] for item in products if item['product'] not in prices
+    })
+    if unknown_ids:
+        codes = ', '.join(str(product_id) for product_id in unknown_ids)
+        raise ValueError(f'Product with code {codes} does not exist')
+
+    return [
+        OrderItem(
+            product_id=item['product'],
+            quantity=item['quantity'],
+            price=prices[item['product']]
+        )
+        for item in products
+    ]
+
+
+def save_orders(orders):
+    if connection.features.can_return_rows_from_bulk_insert:
+        return Order.objects.bulk_create(orders)
+    for order in orders:
+        order.save()
+    return orders
+
+
+def create_orders(orders_data):
+    prices = resolve_prices(
+        item['product']
+        for order_data in orders_data
+        for item in order_data['products']
+    )
+
+    results = []
+    orders = []
+    items_by_order = []
+    for order_data in orders_data:
+        try:
+            order_items = build_order_items(order_data['products'], prices)
+        except ValueError as error:
+            results.append(error)
+            continue
+        order = Order(
+            firstname=order_data['firstname'],
+            lastname=order_data['lastname'],
+            phonenumber=order_data['phonenumber'],
+            address=order_data['address'],
+            total=sum(order_item.get_cost() for order_item in order_items)
+        )
+        orders.append(order)
+        items_by_order.append(order_items)
+        results.append(order)
+
+    if not orders:
+        return results
+
+    save_orders(orders)
+    for order, order_items in zip(orders, items_by_order):
+        for order_item in order_items:
+            order_item.order = order
+    OrderItem.objects.bulk_create(
+        order_item
+        for order_items in items_by_order
+        for order_item in order_items
+    )
+
+    for address in {order.address for order in orders}:
+        GeocodeJob.objects.enqueue(address)
+    OrderCandidate.objects.refresh_for_orders(orders)
+    return results
+
+
+def create_order(order_data):
+    order, = create_orders([order_data])
+    if isinstance(order, ValueError):
+        raise order
+    return order
@@ -0,0 +1,99 @@
+import gzip
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+MIN_COMPRESS_SIZE = 512
+SUPPORTED_ENCODINGS = ('br', 'gzip') if brotli else ('gzip',)
+
+
+def dump_json(data, pretty=False):
+    if pretty:
+        return json.dumps(
+            data,
+            cls=DjangoJSONEncoder,
+            ensure_ascii=False,
+            indent=4
+        ).encode()
+    return json.dumps(
+        data,
+        cls=DjangoJSONEncoder,
+        ensure_ascii=False,
+        separators=(',', ':')
+    ).encode()
+
+
+def compress(content, encodings=SUPPORTED_ENCODINGS):
+    encoded_contents = {'identity': content}
+    if len(content) < MIN_COMPRESS_SIZE:
+        return encoded_contents
+    if 'gzip' in encodings:
+        encoded_contents['gzip'] = gzip.compress(
+            content,
+            compresslevel=9,
+            mtime=0
+        )
+    if brotli and 'br' in encodings:
+        encoded_contents['br'] = brotli.compress(content, quality=9)
+    return encoded_contents
+
+
+def parse_accept_encoding(header):
+    accepted = {}
+    for coding in header.split(','):
+        name, _, params = coding.strip().partition(';')
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0
+        if name:
+            accepted[name.strip().lower()] = quality
+    return accepted
+
+
+def choose_encoding(request, encodings=SUPPORTED_ENCODINGS):
+    accepted = parse_accept_encoding(
+        request.META.get('HTTP_ACCEPT_ENCODING', '')
+    )
+    for encoding in ('br', 'gzip'):
+        quality = accepted.get(encoding, accepted.get('*', 0))
+        if encoding in encodings and quality > 0:
+            return encoding
+    return 'identity'
+
+
+def is_pretty(request):
+    return request.GET.get('pretty') == '1'
+
+
+def encoded_json_response(request, encoded_contents):
+    encoding = choose_encoding(request, encoded_contents)
+    response = HttpResponse(
+        encoded_contents[encoding],
+        content_type='application/json'
+    )
+    if encoding != 'identity':
+        response['Content-Encoding'] = encoding
+    patch_vary_headers(response, ['Accept-Encoding'])
+    return response
+
+
+def json_response(request, data):
+    return encoded_json_response(
+        request,
+        compress(
+            dump_json(data, pretty=is_pretty(request)),
+            encodings=[choose_encoding(request)]
+        )
+    )
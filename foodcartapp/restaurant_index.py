@@ -0,0 +1,143 @@
+import threading
+import time
+
+from django.db.models import Count, Max
+
+from addresses.models import Place
+from addresses.normalization import normalize_address
+from addresses.spatial import GridIndex
+from foodcartapp.cache_versions import bump_version, get_version
+from star_burger import settings
+
+
+class RestaurantLocator:
+
+    version_name = 'restaurants_geo'
+
+    def __init__(self, cell_size):
+        self.cell_size = cell_size
+        self.index = None
+        self.version = None
+        self.marker = None
+        self.marker_checked_at = None
+        self.restaurant_addresses = {}
+        self.lock = threading.RLock()
+
+    def get_marker(self):
+        from foodcartapp.models import Restaurant
+
+        restaurants = tuple(
+            Restaurant.objects.order_by('pk').values_list('id', 'address')
+        )
+        places = Place.objects.for_addresses(
+            address for _, address in restaurants
+        ).aggregate(
+            updated_at=Max('last_updated'),
+            count=Count('pk')
+        )
+        return (places['updated_at'], places['count'], restaurants)
+
+    def is_stale(self):
+        if self.index is None or self.version != get_version(self.version_name):
+            return True
+        now = time.monotonic()
+        check_interval = settings.RESTAURANT_INDEX_CHECK_INTERVAL
+        if now - self.marker_checked_at < check_interval:
+            return False
+        self.marker_checked_at = now
+        return self.get_marker() != self.marker
+
+    def rebuild(self):
+        self.marker = self.get_marker()
+        self.marker_checked_at = time.monotonic()
+        restaurant_addresses = {
+            restaurant_id: normalize_address(address)
+            for restaurant_id, address in self.marker[2]
+        }
+        coordinates = {
+            place.normalized_address: place.get_coordinates()
+            for place in Place.objects.filter(
+                normalized_address__in=set(restaurant_addresses.values()),
+                lat__isnull=False
+            )
+        }
+
+        index = GridIndex(self.cell_size)
+        for restaurant_id, normalized_address in restaurant_addresses.items():
+            if normalized_address in coordinates:
+                index.add(restaurant_id, *coordinates[normalized_address])
+
+        self.index = index
+        self.restaurant_addresses = restaurant_addresses
+
+    def commit_changes(self):
+        previous_version = self.version
+        version = bump_version(self.version_name)
+        self.version = version if version == previous_version + 1 else None
+
+    def get_index(self):
+        with self.lock:
+            if self.is_stale():
+                version = get_version(self.version_name)
+                self.rebuild()
+                self.version = version
+            return self.index
+
+    def update_restaurant(self, restaurant_id, address):
+        normalized_address = normalize_address(address)
+        place = Place.objects.filter(
+            normalized_address=normalized_address,
+            lat__isnull=False
+        ).first()
+        with self.lock:
+            index = self.get_index()
+            self.restaurant_addresses[restaurant_id] = normalized_address
+            if place:
+                index.add(restaurant_id, *place.get_coordinates())
+            else:
+                index.remove(restaurant_id)
+            self.commit_changes()
+
+    def remove_restaurant(self, restaurant_id):
+        with self.lock:
+            index = self.get_index()
+            self.restaurant_addresses.pop(restaurant_id, None)
+            index.remove(restaurant_id)
+            self.commit_changes()
+
+    def update_place(self, place):
+        with self.lock:
+            self.get_index()
+            restaurant_ids = [
+                restaurant_id
+                for restaurant_id, normalized_address
+                in self.restaurant_addresses.items()
+                if normalized_address == place.normalized_address
+            ]
+            if not restaurant_ids:
+                return restaurant_ids
+            coordinates = place.get_coordinates()
+            for restaurant_id in restaurant_ids:
+                if coordinates:
+                    self.index.add(restaurant_id, *coordinates)
+                else:
+                    self.index.remove(restaurant_id)
+            self.commit_changes()
+            return restaurant_ids
+
+    def get_coordinates(self, restaurant_id):
+        with self.lock:
+            return self.get_index().points.get(restaurant_id)
+
+    def within(self, lat, lon, radius_km):
+        with self.lock:
+            return self.get_index().within(lat, lon, radius_km)
+
+    def nearest(self, lat, lon, k):
+        with self.lock:
+            return self.get_index().nearest(lat, lon, k)
+
+
+restaurant_locator = RestaurantLocator(
+    cell_size=settings.RESTAURANT_INDEX_CELL_SIZE
+)
@@ -0,0 +1,166 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from addresses.models import GeocodeJob, Place
+from addresses.signals import address_geocoded
+from .cache_versions import bump_version
+from .catalog import invalidate_catalog, log_catalog_changes
+from .images import delete_image_variants, update_image_variants
+from .models import (
+    CANDIDATES_VERSION,
+    Order,
+    OrderCandidate,
+    OrderChange,
+    OrderItem,
+    Product,
+    ProductCategory,
+    Restaurant,
+    RestaurantMenuItem,
+)
+from .restaurant_index import restaurant_locator
+
+
+class RestaurantCandidatesRefresh:
+
+    def __init__(self):
+        self.restaurant_ids = set()
+
+    def __call__(self):
+        OrderCandidate.objects.refresh_for_restaurants(self.restaurant_ids)
+
+
+def refresh_restaurant_candidates(restaurant_id):
+    connection = transaction.get_connection()
+    refresh = getattr(connection, 'restaurant_candidates_refresh', None)
+    is_pending = refresh is not None and any(
+        callback is refresh for _, callback in connection.run_on_commit
+    )
+    if is_pending:
+        refresh.restaurant_ids.add(restaurant_id)
+        return
+
+    refresh = RestaurantCandidatesRefresh()
+    refresh.restaurant_ids.add(restaurant_id)
+    connection.restaurant_candidates_refresh = refresh
+    transaction.on_commit(refresh)
+
+
+@receiver(post_save, sender=Restaurant)
+def update_restaurant_location(sender, instance, **kwargs):
+    if instance.address:
+        GeocodeJob.objects.enqueue(instance.address)
+    restaurant_locator.update_restaurant(instance.pk, instance.address)
+    refresh_restaurant_candidates(instance.pk)
+
+
+@receiver(post_delete, sender=Restaurant)
+def remove_restaurant_location(sender, instance, **kwargs):
+    restaurant_locator.remove_restaurant(instance.pk)
+    bump_version(CANDIDATES_VERSION)
+
+
+@receiver(post_save, sender=Place)
+def update_place_location(sender, instance, **kwargs):
+    for restaurant_id in restaurant_locator.update_place(instance):
+        refresh_restaurant_candidates(restaurant_id)
+
+
+@receiver(post_save, sender=RestaurantMenuItem)
+@receiver(post_delete, sender=RestaurantMenuItem)
+def update_menu_candidates(sender, instance, **kwargs):
+    refresh_restaurant_candidates(instance.restaurant_id)
+
+
+@receiver(post_save, sender=OrderItem)
+def update_order_total(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    loaded_order_id, loaded_cost = instance.loaded_cost
+    cost = instance.get_cost()
+    if loaded_order_id in (None, instance.order_id):
+        Order.objects.add_to_total(instance.order_id, cost - loaded_cost)
+    else:
+        Order.objects.add_to_total(loaded_order_id, -loaded_cost)
+        Order.objects.add_to_total(instance.order_id, cost)
+    instance.loaded_cost = (instance.order_id, cost)
+    order_ids = {loaded_order_id, instance.order_id} - {None}
+    Order.objects.filter(pk__in=order_ids).touch()
+    OrderChange.objects.log(order_ids)
+
+
+@receiver(post_delete, sender=OrderItem)
+def subtract_order_total(sender, instance, **kwargs):
+    loaded_order_id, loaded_cost = instance.loaded_cost
+    Order.objects.add_to_total(loaded_order_id, -loaded_cost)
+    Order.objects.filter(pk=instance.order_id).touch()
+    OrderChange.objects.log([instance.order_id])
+
+
+@receiver(post_save, sender=Order)
+@receiver(post_delete, sender=Order)
+def log_order_change(sender, instance, raw=False, created=False, **kwargs):
+    if raw or created:
+        return
+    Order.objects.filter(pk=instance.pk).touch()
+    OrderChange.objects.log([instance.pk])
+
+
+@receiver(address_geocoded)
+def update_order_candidates(sender, address, **kwargs):
+    OrderCandidate.objects.refresh_for_orders(
+        Order.objects.filter(address=address).exclude(status='CO')
+    )
+
+
+def update_image_variants_on_commit(product_id):
+    product = Product.objects.filter(pk=product_id).first()
+    if product:
+        update_image_variants(product)
+
+
+@receiver(post_save, sender=Product)
+def update_product_image_variants(sender, instance, raw=False, **kwargs):
+    if not raw:
+        transaction.on_commit(
+            lambda: update_image_variants_on_commit(instance.pk)
+        )
+
+
+@receiver(post_delete, sender=Product)
+def delete_product_image_variants(sender, instance, **kwargs):
+    image_variants = instance.image_variants
+    transaction.on_commit(lambda: delete_image_variants(image_variants))
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def log_product_change(sender, instance, **kwargs):
+    log_catalog_changes([instance.pk])
+    invalidate_catalog()
+
+
+@receiver(post_save, sender=RestaurantMenuItem)
+@receiver(post_delete, sender=RestaurantMenuItem)
+def log_menu_item_change(sender, instance, **kwargs):
+    log_catalog_changes([instance.product_id])
+    invalidate_catalog()
+
+
+@receiver(post_save, sender=Restaurant)
+def log_restaurant_change(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    log_catalog_changes(
+        instance.menu_items.values_list('product_id', flat=True)
+    )
+    invalidate_catalog()
+
+
+@receiver(post_save, sender=ProductCategory)
+@receiver(pre_delete, sender=ProductCategory)
+def log_category_change(sender, instance, **kwargs):
+    log_catalog_changes(
+        Product.objects.filter(category=instance).values_list('pk', flat=True)
+    )
+    invalidate_catalog()
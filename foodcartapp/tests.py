@@ -0,0 +1,672 @@
+from io import BytesIO, StringIO
+from tempfile import TemporaryDirectory
+from unittest.mock import patch
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from PIL import Image
+
+from addresses.distances import get_distance_matrix
+from addresses.models import Place
+from .cache_versions import get_version
+from .capabilities import MenuCapabilityIndex
+from .catalog import CATALOG_VERSION, CatalogQuery
+from .models import (
+    CatalogChange,
+    Order,
+    OrderCandidate,
+    OrderChange,
+    OrderItem,
+    Product,
+    ProductCategory,
+    Restaurant,
+    RestaurantMenuItem,
+)
+from .restaurant_index import restaurant_locator
+
+
+class CatalogTestCase(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.category = ProductCategory.objects.create(name='Бургеры')
+        self.restaurant = Restaurant.objects.create(
+            name='Star Burger Арбат',
+            address='Москва, Арбат, 1'
+        )
+        self.products = [
+            Product.objects.create(
+                name=f'Бургер {number}',
+                category=self.category,
+                price=100 + number
+            )
+            for number in range(3)
+        ]
+        for product in self.products:
+            RestaurantMenuItem.objects.create(
+                restaurant=self.restaurant,
+                product=product
+            )
+
+
+class ProductListApiTest(CatalogTestCase):
+
+    def test_etag_matches_body_and_revalidates(self):
+        response = self.client.get('/api/products/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()), 3)
+
+        response = self.client.get(
+            '/api/products/',
+            HTTP_IF_NONE_MATCH=response['ETag']
+        )
+        self.assertEqual(response.status_code, 304)
+
+    def test_product_change_invalidates_etag(self):
+        etag = self.client.get('/api/products/')['ETag']
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.products[0].price = 500
+            self.products[0].save()
+
+        response = self.client.get('/api/products/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.json()[0]['price'], '500.00')
+
+    def test_caches_only_canonical_pages(self):
+        self.client.get('/api/products/?limit=50')
+        self.client.get('/api/products/?limit=2&fields=id,name')
+        self.client.get('/api/products/?category=999')
+
+        version = get_version(CATALOG_VERSION)
+        self.assertIsNotNone(cache.get(
+            f'catalog:{version}:{CatalogQuery(limit=50).cache_key}'
+        ))
+        self.assertIsNone(cache.get(
+            f'catalog:{version}:'
+            f'{CatalogQuery(limit=2, fields=("id", "name")).cache_key}'
+        ))
+        self.assertIsNone(cache.get(
+            f'catalog:{version}:{CatalogQuery(category_id=999).cache_key}'
+        ))
+
+
+    def test_search_and_special_filters(self):
+        Product.objects.filter(pk=self.products[2].pk).update(
+            special_status=True
+        )
+
+        response = self.client.get('/api/products/?limit=2&q=%20Бургер%201')
+        self.assertEqual(
+            [product['id'] for product in response.json()['results']],
+            [self.products[1].pk]
+        )
+        response = self.client.get('/api/products/?q=Бургер&limit=2')
+        self.assertIsNotNone(response.json()['next_cursor'])
+
+        response = self.client.get('/api/products/?special=1&limit=50')
+        self.assertEqual(
+            [product['id'] for product in response.json()['results']],
+            [self.products[2].pk]
+        )
+
+    def test_uncached_page_is_compressed_once(self):
+        Product.objects.filter(pk__in=[
+            product.pk for product in self.products
+        ]).update(description='Сочная котлета ' * 100)
+
+        with patch('foodcartapp.responses.gzip.compress') as gzip_compress:
+            gzip_compress.return_value = b'gzip'
+            response = self.client.get(
+                '/api/products/?limit=2&q=Бургер',
+                HTTP_ACCEPT_ENCODING='gzip'
+            )
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response.content, b'gzip')
+        gzip_compress.assert_called_once()
+
+        with patch('foodcartapp.responses.gzip.compress') as gzip_compress:
+            response = self.client.get(
+                '/api/products/?limit=2&q=Бургер',
+                HTTP_ACCEPT_ENCODING='identity'
+            )
+        self.assertFalse(response.has_header('Content-Encoding'))
+        gzip_compress.assert_not_called()
+
+
+@patch('star_burger.settings.CATALOG_CHANGES_LAG', 0)
+class ProductChangesApiTest(CatalogTestCase):
+
+    def get_changes(self, since):
+        return self.client.get(f'/api/products/changes/?since={since}')
+
+    def test_returns_changed_and_deleted_products(self):
+        since = int(self.client.get('/api/products/')['X-Catalog-Version'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.products[0].price = 500
+            self.products[0].save()
+            deleted_product_id = self.products[1].pk
+            self.products[1].delete()
+
+        changes = self.get_changes(since).json()
+        self.assertEqual(
+            [product['id'] for product in changes['upserts']],
+            [self.products[0].pk]
+        )
+        self.assertEqual(changes['deletions'], [deleted_product_id])
+        self.assertGreater(changes['version'], since)
+
+        changes = self.get_changes(changes['version']).json()
+        self.assertEqual(changes['upserts'], [])
+        self.assertEqual(changes['deletions'], [])
+
+    def test_recent_changes_are_read_again(self):
+        since = int(self.client.get('/api/products/')['X-Catalog-Version'])
+        self.products[0].save()
+
+        with patch('star_burger.settings.CATALOG_CHANGES_LAG', 60):
+            changes = self.get_changes(since).json()
+        self.assertEqual(changes['version'], since)
+        self.assertEqual(len(changes['upserts']), 1)
+
+    def test_category_delete_logs_its_products(self):
+        since = int(self.client.get('/api/products/')['X-Catalog-Version'])
+
+        self.category.delete()
+
+        changes = self.get_changes(since).json()
+        self.assertEqual(
+            [product['id'] for product in changes['upserts']],
+            [product.pk for product in self.products]
+        )
+        self.assertTrue(all(
+            product['category'] is None for product in changes['upserts']
+        ))
+
+    def test_pruned_history_is_gone(self):
+        self.products[0].save()
+        call_command('clear_catalog_changes', hours=0, stdout=StringIO())
+
+        self.assertEqual(CatalogChange.objects.count(), 1)
+        self.assertEqual(self.get_changes(0).status_code, 410)
+
+
+@patch('star_burger.settings.PRODUCT_IMAGE_WIDTHS', [160, 320])
+class ProductImageVariantsTest(CatalogTestCase):
+
+    def setUp(self):
+        super().setUp()
+        media_root = TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        media_settings = override_settings(MEDIA_ROOT=media_root.name)
+        media_settings.enable()
+        self.addCleanup(media_settings.disable)
+
+    def upload_image(self, product, name='burger.png'):
+        content = BytesIO()
+        Image.new('RGB', (800, 600), 'orange').save(content, 'PNG')
+        product.image = SimpleUploadedFile(name, content.getvalue())
+        with self.captureOnCommitCallbacks(execute=True):
+            product.save()
+        product.refresh_from_db()
+
+    def test_image_upload_makes_variants(self):
+        product = self.products[0]
+        self.upload_image(product)
+
+        variants = product.image_variants['variants']
+        self.assertEqual(
+            sorted(
+                (variant['width'], variant['format']) for variant in variants
+            ),
+            [(160, 'jpg'), (160, 'webp'), (320, 'jpg'), (320, 'webp')]
+        )
+        for variant in variants:
+            self.assertTrue(default_storage.exists(variant['name']))
+        self.assertTrue(
+            product.get_image_url(200, 'webp').endswith('-320w.webp')
+        )
+
+        response = self.client.get('/api/products/')
+        self.assertEqual(len(response.json()[0]['srcset']), 4)
+
+    def test_unchanged_image_keeps_variants(self):
+        product = self.products[0]
+        self.upload_image(product)
+
+        with patch('foodcartapp.images.generate_image_variants') as generate:
+            with self.captureOnCommitCallbacks(execute=True):
+                product.save()
+        generate.assert_not_called()
+
+    def test_variants_are_made_after_commit(self):
+        product = self.products[0]
+
+        with patch('foodcartapp.images.generate_image_variants') as generate:
+            generate.return_value = []
+            with self.captureOnCommitCallbacks() as callbacks:
+                product.image = 'burger.png'
+                product.save()
+            generate.assert_not_called()
+
+            for callback in callbacks:
+                callback()
+            generate.assert_called_once()
+
+    def test_replaced_image_deletes_old_variants(self):
+        product = self.products[0]
+        self.upload_image(product)
+        old_variants = product.image_variants['variants']
+
+        self.upload_image(product, name='cheeseburger.png')
+
+        for variant in old_variants:
+            self.assertFalse(default_storage.exists(variant['name']))
+        for variant in product.image_variants['variants']:
+            self.assertTrue(default_storage.exists(variant['name']))
+
+    def test_deleted_product_deletes_variants(self):
+        product = self.products[0]
+        self.upload_image(product)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            product.delete()
+
+        for variant in product.image_variants['variants']:
+            self.assertFalse(default_storage.exists(variant['name']))
+
+
+class OrderApiTestCase(CatalogTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.products += [
+            Product.objects.create(
+                name=f'Картошка {number}',
+                category=self.category,
+                price=50 + number
+            )
+            for number in range(17)
+        ]
+
+    def get_order_data(self, products_count=1, **order_data):
+        return {
+            'firstname': 'Иван',
+            'lastname': 'Петров',
+            'phonenumber': '+79291234567',
+            'address': 'Москва, Арбат, 10',
+            'products': [
+                {'product': product.pk, 'quantity': 2}
+                for product in self.products[:products_count]
+            ],
+            **order_data,
+        }
+
+    def post_order(self, order_data, **headers):
+        return self.client.post(
+            '/api/order/',
+            order_data,
+            content_type='application/json',
+            **headers
+        )
+
+
+class RegisterOrderApiTest(OrderApiTestCase):
+
+    def test_query_count_does_not_depend_on_items_count(self):
+        self.post_order(self.get_order_data())
+
+        queries_counts = []
+        for products_count in (1, 20):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.post_order(self.get_order_data(products_count))
+            self.assertEqual(response.status_code, 200)
+            queries_counts.append(len(queries))
+
+        self.assertEqual(queries_counts[0], queries_counts[1])
+
+        order = Order.objects.latest('pk')
+        self.assertEqual(order.items.count(), 20)
+        self.assertEqual(
+            order.total,
+            sum(product.price * 2 for product in self.products)
+        )
+
+    def test_order_uses_current_price(self):
+        self.post_order(self.get_order_data())
+        Product.objects.filter(pk=self.products[0].pk).update(price=500)
+
+        self.post_order(self.get_order_data())
+
+        order = Order.objects.latest('pk')
+        self.assertEqual(order.items.get().price, 500)
+        self.assertEqual(order.total, 1000)
+
+    def test_unknown_product_is_rejected(self):
+        order_data = self.get_order_data()
+        order_data['products'].append({'product': 999, 'quantity': 1})
+
+        response = self.post_order(order_data)
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            response.json(),
+            {'error': 'Product with code 999 does not exist'}
+        )
+        self.assertFalse(Order.objects.exists())
+
+    def test_idempotent_request_is_replayed(self):
+        order_data = self.get_order_data()
+
+        response = self.post_order(order_data, HTTP_IDEMPOTENCY_KEY='order-1')
+        replayed_response = self.post_order(
+            order_data,
+            HTTP_IDEMPOTENCY_KEY='order-1'
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(replayed_response.status_code, 200)
+        self.assertEqual(replayed_response.json(), response.json())
+        self.assertEqual(replayed_response['Idempotent-Replayed'], 'true')
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_idempotency_key_reuse_with_other_body_is_rejected(self):
+        self.post_order(self.get_order_data(), HTTP_IDEMPOTENCY_KEY='order-1')
+
+        response = self.post_order(
+            self.get_order_data(2),
+            HTTP_IDEMPOTENCY_KEY='order-1'
+        )
+
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(Order.objects.count(), 1)
+
+
+@patch('star_burger.settings.ORDER_BATCH_TOKENS', ['partner-token'])
+class RegisterOrdersBatchApiTest(OrderApiTestCase):
+
+    def post_batch(self, orders_data, token='partner-token'):
+        return self.client.post(
+            '/api/orders/batch/',
+            orders_data,
+            content_type='application/json',
+            HTTP_AUTHORIZATION=f'Token {token}'
+        )
+
+    def test_mixed_batch_saves_valid_orders(self):
+        unknown_product_order = self.get_order_data()
+        unknown_product_order['products'] = [{'product': 999, 'quantity': 1}]
+
+        response = self.post_batch([
+            self.get_order_data(),
+            self.get_order_data(phonenumber='не телефон'),
+            unknown_product_order,
+            self.get_order_data(3),
+        ])
+
+        self.assertEqual(response.status_code, 200)
+        results = response.json()['results']
+        self.assertEqual(
+            [result['status'] for result in results],
+            ['created', 'rejected', 'rejected', 'created']
+        )
+        self.assertIn('phonenumber', results[1]['errors'])
+        self.assertEqual(
+            results[2]['errors'],
+            {'products': ['Product with code 999 does not exist']}
+        )
+        self.assertEqual(
+            sorted(Order.objects.values_list('pk', flat=True)),
+            [results[0]['id'], results[3]['id']]
+        )
+
+    def test_unknown_token_is_forbidden(self):
+        response = self.post_batch([self.get_order_data()], token='unknown')
+
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(Order.objects.exists())
+
+    @patch('star_burger.settings.ORDER_BATCH_RATE', '1/min')
+    def test_partner_is_throttled(self):
+        self.assertEqual(self.post_batch([]).status_code, 200)
+        self.assertEqual(self.post_batch([]).status_code, 429)
+
+
+class OrderCandidatesRefreshTest(OrderApiTestCase):
+
+    def setUp(self):
+        super().setUp()
+        Place.objects.create(
+            address=self.restaurant.address,
+            lat=55.75,
+            lon=37.59
+        )
+        Place.objects.create(address='Москва, Арбат, 10', lat=55.75, lon=37.6)
+        self.post_order(self.get_order_data())
+        self.order = Order.objects.get()
+
+    def test_each_order_gets_own_distances(self):
+        Place.objects.create(address='Москва, Тверская, 1', lat=55.76, lon=37.61)
+        self.post_order(self.get_order_data(address='Москва, Тверская, 1'))
+
+        orders = Order.objects.order_by('pk').prefetch_related(
+            'items'
+        ).select_restaurants()
+
+        expected_distances = get_distance_matrix(
+            [(55.75, 37.59)],
+            [(55.75, 37.6), (55.76, 37.61)]
+        )[0]
+        self.assertEqual(
+            [
+                [
+                    (candidate.restaurant_id, candidate.distance)
+                    for candidate in order.available_restaurants
+                ]
+                for order in orders
+            ],
+            [
+                [(self.restaurant.pk, int(distance))]
+                for distance in expected_distances
+            ]
+        )
+        self.assertEqual(
+            list(
+                OrderCandidate.objects.order_by('order')
+                .values_list('distance', flat=True)
+            ),
+            [int(distance) for distance in expected_distances]
+        )
+
+    def test_restaurant_refresh_touches_affected_orders(self):
+        self.assertTrue(self.order.candidates.exists())
+        RestaurantMenuItem.objects.filter(product=self.products[0]).update(
+            availability=False
+        )
+
+        OrderCandidate.objects.refresh_for_restaurant(self.restaurant.pk)
+
+        order = Order.objects.get()
+        self.assertGreater(order.revision, self.order.revision)
+        self.assertFalse(order.candidates.exists())
+
+
+class MenuCapabilityIndexTest(CatalogTestCase):
+
+    def test_finds_restaurants_that_cook_every_product(self):
+        capability_index = MenuCapabilityIndex([
+            (1, 10_000_001),
+            (1, 10_000_002),
+            (2, 10_000_002),
+        ])
+
+        self.assertEqual(capability_index.get_restaurant_ids([]), [1, 2])
+        self.assertEqual(
+            capability_index.get_restaurant_ids([10_000_002]),
+            [1, 2]
+        )
+        self.assertEqual(
+            capability_index.get_restaurant_ids([10_000_001, 10_000_002]),
+            [1]
+        )
+        self.assertEqual(capability_index.get_restaurant_ids([3]), [])
+        self.assertFalse(capability_index.can_cook(
+            2,
+            capability_index.get_products_mask([10_000_001])
+        ))
+        self.assertLess(
+            capability_index.get_products_mask([10_000_001, 10_000_002]),
+            4
+        )
+
+    def test_cached_index_follows_menu_changes(self):
+        capability_index = RestaurantMenuItem.objects.capability_index()
+        self.assertEqual(
+            capability_index.get_restaurant_ids([self.products[0].pk]),
+            [self.restaurant.pk]
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            RestaurantMenuItem.objects.filter(
+                product=self.products[0]
+            ).get().delete()
+
+        capability_index = RestaurantMenuItem.objects.capability_index()
+        self.assertEqual(
+            capability_index.get_restaurant_ids([self.products[0].pk]),
+            []
+        )
+
+
+class RestaurantLocatorTest(CatalogTestCase):
+
+    def test_marker_ignores_customer_places(self):
+        Place.objects.create(address=self.restaurant.address, lat=55.75)
+        marker = restaurant_locator.get_marker()
+
+        Place.objects.create(address='Москва, Арбат, 10', lat=55.75, lon=37.6)
+        self.assertEqual(restaurant_locator.get_marker(), marker)
+
+        Place.objects.filter(address=self.restaurant.address).update(
+            lon=37.59,
+            last_updated=timezone.now()
+        )
+        self.assertNotEqual(restaurant_locator.get_marker(), marker)
+
+
+@patch('star_burger.settings.CATALOG_CHANGES_LAG', 0)
+class RestaurantCatalogTest(CatalogTestCase):
+
+    def test_restaurant_rename_updates_catalog(self):
+        since = int(self.client.get('/api/products/')['X-Catalog-Version'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.restaurant.name = 'Star Burger Тверская'
+            self.restaurant.save()
+
+        products = self.client.get('/api/products/').json()
+        self.assertEqual(
+            products[0]['restaurants'][0]['name'],
+            'Star Burger Тверская'
+        )
+        changes = self.client.get(
+            f'/api/products/changes/?since={since}'
+        ).json()
+        self.assertEqual(len(changes['upserts']), 3)
+
+
+class OrderTotalTest(OrderApiTestCase):
+
+    def test_reconcile_fixes_drifted_total(self):
+        self.post_order(self.get_order_data(2))
+        order = Order.objects.get()
+        Order.objects.filter(pk=order.pk).update(total=1)
+        last_change_id = OrderChange.objects.get_latest_id()
+
+        drifted_orders = Order.objects.reconcile_totals()
+
+        self.assertEqual(drifted_orders, [order])
+        reconciled_order = Order.objects.get()
+        self.assertEqual(reconciled_order.total, order.total)
+        self.assertGreater(reconciled_order.revision, order.revision)
+        self.assertEqual(
+            list(
+                OrderChange.objects.filter(pk__gt=last_change_id)
+                .values_list('order_id', flat=True)
+            ),
+            [order.pk]
+        )
+
+
+class OrderAdminTotalTest(OrderApiTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(User.objects.create_superuser('admin'))
+        self.post_order(self.get_order_data(2))
+        self.order = Order.objects.get()
+        self.items = list(self.order.items.order_by('pk'))
+
+    def save_in_admin(self, items):
+        data = {
+            'firstname': self.order.firstname,
+            'lastname': self.order.lastname,
+            'phonenumber': str(self.order.phonenumber),
+            'address': self.order.address,
+            'status': self.order.status,
+            'comment': '',
+            'registered_at_0': self.order.registered_at.strftime('%Y-%m-%d'),
+            'registered_at_1': self.order.registered_at.strftime('%H:%M:%S'),
+            'payment_type': self.order.payment_type,
+            'items-TOTAL_FORMS': len(items),
+            'items-INITIAL_FORMS': len(self.items),
+            'items-MIN_NUM_FORMS': 0,
+            'items-MAX_NUM_FORMS': 1000,
+        }
+        for number, item in enumerate(items):
+            for field, value in item.items():
+                data[f'items-{number}-{field}'] = value
+            data[f'items-{number}-order'] = self.order.pk
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                f'/admin/foodcartapp/order/{self.order.pk}/change/',
+                data
+            )
+        self.assertEqual(response.status_code, 302)
+        return Order.objects.get()
+
+    def get_item_data(self, item, **changes):
+        return {
+            'id': item.pk,
+            'product': item.product_id,
+            'quantity': item.quantity,
+            'price': item.price,
+            **changes,
+        }
+
+    def test_item_edit_and_delete_update_total(self):
+        order = self.save_in_admin([
+            self.get_item_data(self.items[0], quantity=5, price=10),
+            self.get_item_data(self.items[1], DELETE='on'),
+            {
+                'product': self.products[5].pk,
+                'quantity': 1,
+                'price': 7,
+            },
+        ])
+
+        self.assertEqual(order.total, 57)
+        self.assertEqual(
+            order.total,
+            sum(item.get_cost() for item in OrderItem.objects.all())
+        )
+        self.assertGreater(order.revision, self.order.revision)
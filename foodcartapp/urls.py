@@ -1,12 +1,15 @@
 from django.urls import path
 
 from .views import product_list_api, banners_list_api, register_order
+from .views import product_changes_api, register_orders_batch
 
 
 app_name = "foodcartapp"
 
 urlpatterns = [
     path('products/', product_list_api),
+    path('products/changes/', product_changes_api),
     path('banners/', banners_list_api),
     path('order/', register_order),
+    path('orders/batch/', register_orders_batch),
 ]
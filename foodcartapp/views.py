@@ -1,24 +1,49 @@
-from django.core.exceptions import ObjectDoesNotExist
+import hashlib
+import json
+from functools import lru_cache
+from hmac import compare_digest
+
 from django.db import transaction
 from django.http import JsonResponse
 from django.templatetags.static import static
-from rest_framework.decorators import api_view
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
+from rest_framework.decorators import (
+    api_view,
+    permission_classes,
+    throttle_classes,
+)
 from rest_framework.exceptions import ValidationError
 from rest_framework.fields import ListField, IntegerField
+from rest_framework.permissions import BasePermission
 from rest_framework.response import Response
 from rest_framework import status
 
 from rest_framework.serializers import Serializer, ModelSerializer
+from rest_framework.throttling import SimpleRateThrottle
 
-from addresses.models import Place
-from addresses.yandex_geo_api import fetch_coordinates
 from star_burger import settings
-from .models import Product, Order, OrderItem
+from .catalog import (
+    get_catalog,
+    get_catalog_changes,
+    is_change_version_expired,
+    parse_catalog_query,
+)
+from .models import IdempotencyKey, Order
+from .orders import create_order, create_orders
+from .responses import (
+    choose_encoding,
+    compress,
+    dump_json,
+    encoded_json_response,
+    is_pretty,
+    json_response,
+)
 
 
-def banners_list_api(request):
+def get_banners():
     # FIXME move data to db?
-    return JsonResponse([
+    return [
         {
             'title': 'Burger',
             'src': static('burger.jpg'),
@@ -34,38 +59,91 @@ def banners_list_api(request):
             'src': static('tasty.jpg'),
             'text': 'Food is incomplete without a tasty dessert',
         }
-    ], safe=False, json_dumps_params={
-        'ensure_ascii': False,
-        'indent': 4,
-    })
+    ]
+
+
+@lru_cache(maxsize=None)
+def get_encoded_banners():
+    return compress(dump_json(get_banners()))
+
+
+def banners_list_api(request):
+    if is_pretty(request):
+        return json_response(request, get_banners())
+    return encoded_json_response(request, get_encoded_banners())
+
+
+def get_request_catalog(request):
+    if not hasattr(request, 'catalog'):
+        encodings = [] if is_pretty(request) else [choose_encoding(request)]
+        request.catalog = get_catalog(
+            parse_catalog_query(request.GET),
+            encodings
+        )
+    return request.catalog
+
+
+def get_catalog_etag(request):
+    try:
+        catalog = get_request_catalog(request)
+    except ValueError:
+        return None
+    if is_pretty(request):
+        return f'{catalog["etag"]}-pretty'
+    encoding = choose_encoding(request, catalog['encoded_contents'])
+    return f'{catalog["etag"]}-{encoding}'
 
 
+def get_catalog_last_modified(request):
+    try:
+        return get_request_catalog(request)['last_modified']
+    except ValueError:
+        return None
+
+
+@cache_control(no_cache=True)
+@condition(
+    etag_func=get_catalog_etag,
+    last_modified_func=get_catalog_last_modified,
+)
 def product_list_api(request):
-    products = Product.objects.select_related('category').available()
-
-    dumped_products = []
-    for product in products:
-        dumped_product = {
-            'id': product.id,
-            'name': product.name,
-            'price': product.price,
-            'special_status': product.special_status,
-            'description': product.description,
-            'category': {
-                'id': product.category.id,
-                'name': product.category.name,
-            } if product.category else None,
-            'image': product.image.url,
-            'restaurant': {
-                'id': product.id,
-                'name': product.name,
-            }
-        }
-        dumped_products.append(dumped_product)
-    return JsonResponse(dumped_products, safe=False, json_dumps_params={
-        'ensure_ascii': False,
-        'indent': 4,
-    })
+    try:
+        catalog = get_request_catalog(request)
+    except ValueError as error:
+        return JsonResponse(
+            {'error': str(error)},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    if is_pretty(request):
+        response = json_response(
+            request,
+            json.loads(catalog['encoded_contents']['identity'])
+        )
+    else:
+        response = encoded_json_response(
+            request,
+            catalog['encoded_contents']
+        )
+    response['X-Catalog-Version'] = catalog['change_version']
+    return response
+
+
+@cache_control(no_cache=True)
+def product_changes_api(request):
+    try:
+        since = int(request.GET.get('since', ''))
+    except ValueError:
+        return JsonResponse(
+            {'error': 'since must be an integer catalog version'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    if is_change_version_expired(since):
+        return JsonResponse(
+            {'error': 'since is too old, reload the catalog'},
+            status=status.HTTP_410_GONE
+        )
+    return json_response(request, get_catalog_changes(since))
 
 
 class OrderItemSerialiser(Serializer):
@@ -99,55 +177,130 @@ class OrderSerializer(ModelSerializer):
         )
 
 
+def get_request_hash(data):
+    return hashlib.sha256(
+        json.dumps(data, sort_keys=True, ensure_ascii=False).encode()
+    ).hexdigest()
+
+
+def create_order_response(request):
+    order_serializer = OrderSerializer(data=request.data)
+    order_serializer.is_valid(raise_exception=True)
+
+    try:
+        create_order(order_serializer.validated_data)
+    except ValueError as error:
+        return Response({
+            'error': str(error),
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    return Response(order_serializer.data)
+
+
 @api_view(['POST'])
 @transaction.atomic
 def register_order(request):
+    key = request.headers.get('Idempotency-Key')
+    if not key:
+        return create_order_response(request)
 
-    order_serializer = OrderSerializer(data=request.data)
-    order_serializer.is_valid(raise_exception=True)
+    if len(key) > IdempotencyKey._meta.get_field('key').max_length:
+        return Response({
+            'error': 'Idempotency-Key is too long',
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        idempotency_key = IdempotencyKey.objects.claim(
+            key,
+            get_request_hash(request.data)
+        )
+    except ValueError as error:
+        return Response({
+            'error': str(error),
+        }, status=status.HTTP_422_UNPROCESSABLE_ENTITY)
+
+    if idempotency_key.status_code:
+        return Response(
+            idempotency_key.response,
+            status=idempotency_key.status_code,
+            headers={'Idempotent-Replayed': 'true'}
+        )
+
+    response = create_order_response(request)
+    idempotency_key.store_response(response)
+    return response
+
+
+def get_partner_token(request):
+    scheme, _, token = request.headers.get('Authorization', '').partition(' ')
+    if scheme != 'Token' or not token:
+        return None
+    for partner_token in settings.ORDER_BATCH_TOKENS:
+        if compare_digest(token.encode(), partner_token.encode()):
+            return partner_token
+    return None
 
-    order = Order.objects.create(
-        firstname=order_serializer.validated_data['firstname'],
-        lastname=order_serializer.validated_data['lastname'],
-        phonenumber=order_serializer.validated_data['phonenumber'],
-        address=order_serializer.validated_data['address']
-    )
-
-    lat, lon = fetch_coordinates(
-        settings.YANDEX_GEO_API_KEY,
-        order_serializer['address']
-    )
-    place_obj, created = Place.objects.update_or_create(
-        address=order.address,
-        defaults={
-            'lat': lat,
-            'lon': lon
+
+class HasPartnerToken(BasePermission):
+    message = 'Partner token is missing or invalid'
+
+    def has_permission(self, request, view):
+        return get_partner_token(request) is not None
+
+
+class PartnerRateThrottle(SimpleRateThrottle):
+    scope = 'order_batch'
+
+    def get_rate(self):
+        return settings.ORDER_BATCH_RATE
+
+    def get_cache_key(self, request, view):
+        token = get_partner_token(request)
+        if token is None:
+            return None
+        return self.cache_format % {
+            'scope': self.scope,
+            'ident': hashlib.sha256(token.encode()).hexdigest(),
         }
-    )
 
-    if not order_serializer.validated_data['products']:
+
+@api_view(['POST'])
+@permission_classes([HasPartnerToken])
+@throttle_classes([PartnerRateThrottle])
+@transaction.atomic
+def register_orders_batch(request):
+    if not isinstance(request.data, list):
         return Response({
-            'error': 'Products is empty',
+            'error': 'Expected a list of orders',
+        }, status=status.HTTP_400_BAD_REQUEST)
+    if len(request.data) > settings.ORDER_BATCH_MAX_SIZE:
+        return Response({
+            'error': f'Batch is larger than {settings.ORDER_BATCH_MAX_SIZE}'
+                     f' orders',
         }, status=status.HTTP_400_BAD_REQUEST)
 
-    order_items = []
-
-    for product_item in order_serializer.validated_data['products']:
+    order_serializer = OrderSerializer()
+    results = []
+    valid_orders = []
+    for order_data in request.data:
         try:
-            product = Product.objects.get(pk=product_item['product'])
-            order_item = OrderItem(
-                product=product,
-                quantity=product_item['quantity'],
-                order=order,
-                price=product.price
-            )
-            order_items.append(order_item)
-        except ObjectDoesNotExist:
-            return Response({
-                'error': f'Product with code {product_item["product"]}'
-                         f' does not exist',
-            }, status=status.HTTP_400_BAD_REQUEST)
-
-    OrderItem.objects.bulk_create(order_items)
+            valid_orders.append(order_serializer.run_validation(order_data))
+        except ValidationError as error:
+            results.append({'status': 'rejected', 'errors': error.detail})
+        else:
+            results.append(None)
 
-    return Response(order_serializer.data)
+    created_orders = iter(create_orders(valid_orders))
+    for index, result in enumerate(results):
+        if result:
+            continue
+        order = next(created_orders)
+        if isinstance(order, ValueError):
+            results[index] = {
+                'status': 'rejected',
+                'errors': {'products': [str(order)]},
+            }
+        else:
+            results[index] = {'status': 'created', 'id': order.pk}
+
+    return Response({'results': results})
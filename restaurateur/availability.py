@@ -0,0 +1,63 @@
+from array import array
+from bisect import bisect_left
+
+from django.core.cache import cache
+
+from foodcartapp.cache_versions import get_version
+from foodcartapp.catalog import CATALOG_VERSION
+from foodcartapp.models import Product, Restaurant, RestaurantMenuItem
+from star_burger import settings
+
+
+class AvailabilityMatrix:
+
+    def __init__(self, product_ids, restaurant_ids, menu_items):
+        self.product_ids = array('q', sorted(product_ids))
+        self.columns = {
+            restaurant_id: column
+            for column, restaurant_id in enumerate(restaurant_ids)
+        }
+        self.cells = bytearray(len(self.product_ids) * len(self.columns))
+        for product_id, restaurant_id, availability in menu_items:
+            row = self.get_row_index(product_id)
+            column = self.columns.get(restaurant_id)
+            if availability and row is not None and column is not None:
+                self.cells[row * len(self.columns) + column] = 1
+
+    def get_row_index(self, product_id):
+        row = bisect_left(self.product_ids, product_id)
+        if row < len(self.product_ids) and self.product_ids[row] == product_id:
+            return row
+        return None
+
+    def get_availability(self, product_id, restaurant_ids):
+        row = self.get_row_index(product_id)
+        if row is None:
+            return [False] * len(restaurant_ids)
+        row_start = row * len(self.columns)
+        return [
+            restaurant_id in self.columns
+            and self.cells[row_start + self.columns[restaurant_id]] == 1
+            for restaurant_id in restaurant_ids
+        ]
+
+
+def build_availability_matrix():
+    return AvailabilityMatrix(
+        Product.objects.values_list('pk', flat=True),
+        Restaurant.objects.order_by('pk').values_list('pk', flat=True),
+        RestaurantMenuItem.objects.values_list(
+            'product_id',
+            'restaurant_id',
+            'availability'
+        ).iterator()
+    )
+
+
+def get_availability_matrix():
+    key = f'availability_matrix:{get_version(CATALOG_VERSION)}'
+    matrix = cache.get(key)
+    if matrix is None:
+        matrix = build_availability_matrix()
+        cache.set(key, matrix, timeout=settings.CATALOG_CACHE_TIMEOUT)
+    return matrix
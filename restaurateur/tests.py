@@ -1,3 +1,222 @@
+from unittest.mock import patch
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
 from django.test import TestCase
 
-# Create your tests here.
+from foodcartapp.models import (
+    Order,
+    OrderChange,
+    Product,
+    Restaurant,
+    RestaurantMenuItem,
+)
+
+
+class ManagerOrdersTestCase(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(
+            User.objects.create_user('manager', is_staff=True)
+        )
+        self.orders = [
+            Order.objects.create(
+                firstname='Иван',
+                lastname=f'Петров {number}',
+                phonenumber='+79291234567',
+                address='Москва, Арбат, 10',
+                status=status
+            )
+            for number, status in enumerate(['AC', 'AS', 'CO', 'AC', 'AS'])
+        ]
+        OrderChange.objects.log(order.pk for order in self.orders)
+
+
+@patch('star_burger.settings.MANAGER_ORDERS_PAGE_SIZE', 2)
+class OrderListViewTest(ManagerOrdersTestCase):
+
+    def get_pages(self, query=''):
+        pages = []
+        while query is not None:
+            response = self.client.get(f'/manager/orders/?{query}')
+            self.assertEqual(response.status_code, 200)
+            pages.append([
+                order.pk for order in response.context['order_items']
+            ])
+            query = response.context['next_page_query']
+        return pages
+
+    def test_pages_cover_open_orders_once(self):
+        open_order_ids = sorted(
+            (order.pk for order in self.orders if order.status != 'CO'),
+            reverse=True
+        )
+
+        pages = self.get_pages()
+
+        self.assertEqual(pages, [open_order_ids[:2], open_order_ids[2:]])
+
+    def test_pages_keep_filters(self):
+        order_ids = sorted(
+            (order.pk for order in self.orders if order.status == 'AC'),
+            reverse=True
+        )
+
+        self.assertEqual(self.get_pages('status=AC'), [order_ids])
+
+    def test_page_is_stable_when_new_orders_arrive(self):
+        response = self.client.get('/manager/orders/')
+        Order.objects.create(
+            firstname='Мария',
+            lastname='Иванова',
+            phonenumber='+79291234568',
+            address='Москва, Арбат, 12'
+        )
+
+        pages = self.get_pages(response.context['next_page_query'])
+
+        self.assertEqual(pages, [[self.orders[1].pk, self.orders[0].pk]])
+
+
+@patch('star_burger.settings.ORDER_STREAM_TIMEOUT', 0)
+class OrderStreamViewTest(ManagerOrdersTestCase):
+
+    def get_events(self, last_change_id):
+        response = self.client.get(
+            f'/manager/orders/stream/?last_change_id={last_change_id}'
+        )
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        return b''.join(response.streaming_content).decode()
+
+    @patch('star_burger.settings.ORDER_CHANGES_LAG', 0)
+    def test_sends_changed_rows_and_moves_cursor(self):
+        last_change_id = OrderChange.objects.get_latest_id()
+        self.orders[0].status = 'CO'
+        self.orders[0].save()
+        self.orders[1].status = 'DE'
+        self.orders[1].save()
+
+        events = self.get_events(last_change_id)
+
+        self.assertIn(
+            f'event: remove\ndata: {{"id": {self.orders[0].pk}}}',
+            events
+        )
+        self.assertIn(f'"id": {self.orders[1].pk}, "html"', events)
+        self.assertIn(f'id: {OrderChange.objects.get_latest_id()}\n', events)
+
+    @patch('star_burger.settings.ORDER_CHANGES_LAG', 60)
+    def test_late_change_is_sent_once(self):
+        cursor = OrderChange.objects.get_latest_id()
+        self.orders[1].save()
+        late_change = OrderChange.objects.latest('pk')
+        OrderChange.objects.filter(pk=late_change.pk).delete()
+        self.orders[3].save()
+
+        events = self.get_events(cursor)
+        self.assertNotIn(f'"id": {self.orders[1].pk}, "html"', events)
+        self.assertIn(f'"id": {self.orders[3].pk}, "html"', events)
+        cursor = f'{late_change.pk + 1}:{late_change.pk}'
+        self.assertIn(f'id: {cursor}\n', events)
+
+        late_change.save()
+        events = self.get_events(cursor)
+        self.assertIn(f'"id": {self.orders[1].pk}, "html"', events)
+        self.assertNotIn(f'"id": {self.orders[3].pk}, "html"', events)
+        cursor = str(late_change.pk + 1)
+        self.assertIn(f'id: {cursor}\n', events)
+
+        events = self.get_events(cursor)
+        self.assertNotIn('event: row', events)
+
+    @patch('star_burger.settings.ORDER_CHANGES_LAG', 0)
+    def test_missing_change_is_dropped_after_lag(self):
+        cursor = OrderChange.objects.get_latest_id()
+        self.orders[1].save()
+        OrderChange.objects.latest('pk').delete()
+        self.orders[3].save()
+
+        events = self.get_events(cursor)
+
+        self.assertIn(f'id: {cursor + 2}\n', events)
+
+
+@patch('star_burger.settings.MANAGER_PRODUCTS_PAGE_SIZE', 2)
+class ProductListViewTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(
+            User.objects.create_user('manager', is_staff=True)
+        )
+        self.restaurants = [
+            Restaurant.objects.create(name=f'Star Burger {number}')
+            for number in range(3)
+        ]
+        self.products = [
+            Product.objects.create(
+                name=f'Бургер {number}',
+                price=100,
+                image='burger.png'
+            )
+            for number in range(5)
+        ]
+        for product_number, product in enumerate(self.products):
+            for restaurant_number, restaurant in enumerate(self.restaurants):
+                if (product_number + restaurant_number) % 3 == 0:
+                    continue
+                RestaurantMenuItem.objects.create(
+                    restaurant=restaurant,
+                    product=product,
+                    availability=product_number != restaurant_number
+                )
+
+    def get_rows(self):
+        rows = {}
+        page_number = 1
+        while page_number:
+            response = self.client.get(
+                f'/manager/products/?page={page_number}'
+            )
+            self.assertEqual(
+                response.context['restaurants'],
+                self.restaurants
+            )
+            for product, availability in response.context[
+                'products_with_restaurant_availability'
+            ]:
+                rows[product.pk] = availability
+            page = response.context['page']
+            page_number = page.has_next() and page.next_page_number()
+        return rows
+
+    def get_menu_rows(self):
+        available_items = set(
+            RestaurantMenuItem.objects.filter(availability=True)
+            .values_list('product_id', 'restaurant_id')
+        )
+        return {
+            product.pk: [
+                (product.pk, restaurant.pk) in available_items
+                for restaurant in self.restaurants
+            ]
+            for product in self.products
+        }
+
+    def test_matrix_matches_menu(self):
+        self.assertEqual(self.get_rows(), self.get_menu_rows())
+
+    def test_menu_change_updates_matrix(self):
+        self.get_rows()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            RestaurantMenuItem.objects.filter(
+                restaurant=self.restaurants[1]
+            ).first().delete()
+            RestaurantMenuItem.objects.create(
+                restaurant=self.restaurants[0],
+                product=self.products[0]
+            )
+
+        self.assertEqual(self.get_rows(), self.get_menu_rows())
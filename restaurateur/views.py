@@ -1,7 +1,13 @@
+import json
+import time
+
 from django import forms
+from django.core.paginator import Paginator
+from django.http import StreamingHttpResponse
 from django.shortcuts import redirect, render
+from django.template.loader import render_to_string
 from django.views import View
-from django.urls import reverse_lazy
+from django.urls import reverse, reverse_lazy
 from django.contrib.auth.decorators import user_passes_test
 
 from django.contrib.auth import authenticate, login
@@ -9,6 +15,52 @@ from django.contrib.auth import views as auth_views
 
 
 from foodcartapp.models import Product, Restaurant, Order, RestaurantMenuItem
+from foodcartapp.cache_versions import get_version
+from foodcartapp.models import CANDIDATES_VERSION, OrderChange
+from restaurateur.availability import get_availability_matrix
+from star_burger import settings
+
+
+ORDER_STREAM_BATCH_SIZE = 500
+
+
+class OrderFilter(forms.Form):
+    status = forms.ChoiceField(
+        label='Статус',
+        required=False,
+        choices=[('', 'Все')] + [
+            choice for choice in Order.ORDER_STATUS_CHOICES
+            if choice[0] != 'CO'
+        ],
+        widget=forms.Select(attrs={'class': 'form-control'})
+    )
+    payment_type = forms.ChoiceField(
+        label='Оплата',
+        required=False,
+        choices=[('', 'Все')] + Order.ORDER_PAYMENT_CHOICES,
+        widget=forms.Select(attrs={'class': 'form-control'})
+    )
+    restaurant = forms.ModelChoiceField(
+        label='Ресторан',
+        required=False,
+        queryset=Restaurant.objects.order_by('name'),
+        empty_label='Все',
+        widget=forms.Select(attrs={'class': 'form-control'})
+    )
+    after = forms.IntegerField(
+        required=False,
+        min_value=1,
+        widget=forms.HiddenInput
+    )
+
+
+class ProductFilter(forms.Form):
+    restaurants = forms.ModelMultipleChoiceField(
+        label='Рестораны',
+        required=False,
+        queryset=Restaurant.objects.order_by('name'),
+        widget=forms.CheckboxSelectMultiple
+    )
 
 
 class Login(forms.Form):
@@ -65,21 +117,39 @@ def is_manager(user):
 
 @user_passes_test(is_manager, login_url='restaurateur:login')
 def view_products(request):
-    restaurants = list(Restaurant.objects.order_by('name'))
-    products = list(Product.objects.prefetch_related('menu_items'))
+    product_filter = ProductFilter(request.GET)
+    product_filter.is_valid()
+    restaurants = list(
+        product_filter.cleaned_data.get('restaurants')
+        or Restaurant.objects.order_by('name')
+    )
+    restaurant_ids = [restaurant.pk for restaurant in restaurants]
+
+    matrix = get_availability_matrix()
+    page = Paginator(
+        matrix.product_ids,
+        settings.MANAGER_PRODUCTS_PAGE_SIZE
+    ).get_page(request.GET.get('page'))
+    products = Product.objects.select_related('category').filter(
+        pk__in=list(page)
+    ).order_by('pk')
 
     products_with_restaurant_availability = []
     for product in products:
-        availability = {item.restaurant_id: item.availability for item in product.menu_items.all()}
-        ordered_availability = [availability.get(restaurant.id, False) for restaurant in restaurants]
-
+        product.image_url = product.get_image_url(100)
         products_with_restaurant_availability.append(
-            (product, ordered_availability)
+            (product, matrix.get_availability(product.pk, restaurant_ids))
         )
 
+    query = request.GET.copy()
+    query.pop('page', None)
+
     return render(request, template_name="products_list.html", context={
         'products_with_restaurant_availability': products_with_restaurant_availability,
         'restaurants': restaurants,
+        'product_filter': product_filter,
+        'page': page,
+        'filter_query': query.urlencode(),
     })
 
 
@@ -90,12 +160,157 @@ def view_restaurants(request):
     })
 
 
+def filter_orders(orders, filters):
+    orders = orders.exclude(status='CO')
+    if filters.get('status'):
+        orders = orders.filter(status=filters['status'])
+    if filters.get('payment_type'):
+        orders = orders.filter(payment_type=filters['payment_type'])
+    if filters.get('restaurant'):
+        orders = orders.filter(production_restaurant=filters['restaurant'])
+    return orders.with_candidates().select_related('production_restaurant')
+
+
+def get_order_cache_context():
+    return {
+        'order_cache_timeout': settings.ORDER_ROW_CACHE_TIMEOUT,
+        'candidates_version': get_version(CANDIDATES_VERSION),
+    }
+
+
 @user_passes_test(is_manager, login_url='restaurateur:login')
 def view_orders(request):
-    orders = Order.objects.prefetch_related('items__product').get_amount().\
-        exclude(status='CO').order_by('-id').select_restaurants()
+    order_filter = OrderFilter(request.GET)
+    order_filter.is_valid()
+    filters = order_filter.cleaned_data
+
+    last_change_cursor = format_cursor(*OrderChange.objects.get_cursor())
+    orders = filter_orders(Order.objects.all(), filters)
+    if filters.get('after'):
+        orders = orders.filter(pk__lt=filters['after'])
+
+    page_size = settings.MANAGER_ORDERS_PAGE_SIZE
+    orders = list(
+        orders.order_by('-id')[:page_size + 1].get_coordinates()
+    )
+    next_after = orders[page_size - 1].pk if len(orders) > page_size else None
+
+    query = request.GET.copy()
+    query.pop('after', None)
+    next_query = None
+    if next_after:
+        query['after'] = next_after
+        next_query = query.urlencode()
+        query.pop('after')
 
     return render(request, template_name='order_items.html', context={
-        'order_items': orders,
-        'path': request.path,
+        'order_items': orders[:page_size],
+        'order_filter': order_filter,
+        'first_page_query': query.urlencode(),
+        'next_page_query': next_query,
+        'is_first_page': not filters.get('after'),
+        'last_change_cursor': last_change_cursor,
+        'path': request.get_full_path(),
+        **get_order_cache_context(),
     })
+
+
+def format_event(event, data, event_id=None):
+    lines = [f'event: {event}', f'data: {json.dumps(data)}']
+    if event_id:
+        lines.insert(0, f'id: {event_id}')
+    return '\n'.join(lines) + '\n\n'
+
+
+def get_order_events(changes, filters, path):
+    order_ids = {order_id for _, order_id in changes}
+    orders = filter_orders(Order.objects.filter(pk__in=order_ids), filters).\
+        get_coordinates()
+
+    events = []
+    for order in orders:
+        events.append(('row', {
+            'id': order.pk,
+            'html': render_to_string('order_row.html', {
+                'order_item': order,
+                'path': path,
+                **get_order_cache_context(),
+            }),
+        }))
+    for order_id in sorted(order_ids - {order.pk for order in orders}):
+        events.append(('remove', {'id': order_id}))
+    return events
+
+
+def format_cursor(last_change_id, missing_ids):
+    if not missing_ids:
+        return str(last_change_id)
+    return f'{last_change_id}:{",".join(map(str, sorted(missing_ids)))}'
+
+
+def parse_cursor(cursor):
+    last_change_id, _, missing_ids = cursor.partition(':')
+    missing_ids = {
+        int(change_id) for change_id in missing_ids.split(',') if change_id
+    }
+    if len(missing_ids) > ORDER_STREAM_BATCH_SIZE:
+        raise ValueError('Too many missing change ids')
+    return int(last_change_id), missing_ids
+
+
+def stream_order_changes(cursor, filters, path):
+    yield f'retry: {int(settings.ORDER_STREAM_POLL_INTERVAL * 1000)}\n\n'
+
+    last_change_id, missing_ids = cursor
+    event_id = format_cursor(last_change_id, missing_ids)
+    stream_until = time.monotonic() + settings.ORDER_STREAM_TIMEOUT
+    while True:
+        changes, last_change_id, missing_ids = OrderChange.objects.read(
+            last_change_id,
+            missing_ids,
+            ORDER_STREAM_BATCH_SIZE
+        )
+        previous_event_id = event_id
+        event_id = format_cursor(last_change_id, missing_ids)
+
+        events = get_order_events(changes, filters, path)
+        for event, data in events[:-1]:
+            yield format_event(event, data)
+        if events:
+            event, data = events[-1]
+            yield format_event(event, data, event_id=event_id)
+        elif event_id != previous_event_id:
+            yield f'id: {event_id}\n\n'
+        else:
+            yield ': ping\n\n'
+
+        if time.monotonic() >= stream_until:
+            break
+        if len(changes) < ORDER_STREAM_BATCH_SIZE:
+            time.sleep(settings.ORDER_STREAM_POLL_INTERVAL)
+
+
+@user_passes_test(is_manager, login_url='restaurateur:login')
+def stream_orders(request):
+    order_filter = OrderFilter(request.GET)
+    order_filter.is_valid()
+
+    try:
+        cursor = parse_cursor(
+            request.headers.get('Last-Event-ID')
+            or request.GET.get('last_change_id')
+        )
+    except (AttributeError, ValueError):
+        cursor = OrderChange.objects.get_cursor()
+
+    query = request.GET.copy()
+    query.pop('last_change_id', None)
+    path = f'{reverse("restaurateur:view_orders")}?{query.urlencode()}'
+
+    response = StreamingHttpResponse(
+        stream_order_changes(cursor, order_filter.cleaned_data, path),
+        content_type='text/event-stream'
+    )
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
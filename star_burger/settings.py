@@ -90,6 +90,39 @@ DATABASES = {
     'default': dj_database_url.parse(env('DB_CONFIG'))
 }
 
+CACHES = {
+    'default': {
+        'BACKEND': env.str(
+            'CACHE_BACKEND',
+            'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': env.str('CACHE_LOCATION', ''),
+    }
+}
+
+CATALOG_CACHE_TIMEOUT = env.int('CATALOG_CACHE_TIMEOUT', 24 * 60 * 60)
+CATALOG_PAGE_SIZE = env.int('CATALOG_PAGE_SIZE', 50)
+CATALOG_MAX_PAGE_SIZE = env.int('CATALOG_MAX_PAGE_SIZE', 200)
+CATALOG_CHANGES_LAG = env.int('CATALOG_CHANGES_LAG', 60)
+
+PRODUCT_IMAGE_WIDTHS = env.list(
+    'PRODUCT_IMAGE_WIDTHS',
+    [160, 320, 640],
+    subcast=int
+)
+PRODUCT_IMAGE_QUALITY = env.int('PRODUCT_IMAGE_QUALITY', 80)
+
+IDEMPOTENCY_KEY_TTL_HOURS = env.int('IDEMPOTENCY_KEY_TTL_HOURS', 24)
+ORDER_BATCH_MAX_SIZE = env.int('ORDER_BATCH_MAX_SIZE', 500)
+ORDER_BATCH_TOKENS = env.list('ORDER_BATCH_TOKENS', [])
+ORDER_BATCH_RATE = env.str('ORDER_BATCH_RATE', '60/min')
+MANAGER_ORDERS_PAGE_SIZE = env.int('MANAGER_ORDERS_PAGE_SIZE', 50)
+MANAGER_PRODUCTS_PAGE_SIZE = env.int('MANAGER_PRODUCTS_PAGE_SIZE', 100)
+ORDER_ROW_CACHE_TIMEOUT = env.int('ORDER_ROW_CACHE_TIMEOUT', 60 * 60)
+ORDER_STREAM_POLL_INTERVAL = env.float('ORDER_STREAM_POLL_INTERVAL', 2)
+ORDER_STREAM_TIMEOUT = env.int('ORDER_STREAM_TIMEOUT', 0)
+ORDER_CHANGES_LAG = env.int('ORDER_CHANGES_LAG', 30)
+
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -129,6 +162,41 @@ STATICFILES_DIRS = [
 STATIC_URL = 'static/'
 
 YANDEX_GEO_API_KEY = env.str('YANDEX_GEO_API_KEY')
+YANDEX_GEO_API_URL = env.str(
+    'YANDEX_GEO_API_URL',
+    'https://geocode-maps.yandex.ru/1.x'
+)
+
+GEOCODER_BACKEND = env.str(
+    'GEOCODER_BACKEND',
+    'addresses.geocoders.YandexGeocoder'
+)
+GEOCODER_FIXTURE = env.str('GEOCODER_FIXTURE', None)
+
+GEOCODER_CONNECT_TIMEOUT = env.float('GEOCODER_CONNECT_TIMEOUT', 3.05)
+GEOCODER_READ_TIMEOUT = env.float('GEOCODER_READ_TIMEOUT', 5)
+GEOCODER_RETRIES = env.int('GEOCODER_RETRIES', 2)
+GEOCODER_BACKOFF_FACTOR = env.float('GEOCODER_BACKOFF_FACTOR', 0.5)
+GEOCODER_CIRCUIT_FAILURES = env.int('GEOCODER_CIRCUIT_FAILURES', 5)
+GEOCODER_CIRCUIT_RESET_TIMEOUT = env.float('GEOCODER_CIRCUIT_RESET_TIMEOUT', 30)
+
+DISTANCE_ENGINE = env.str('DISTANCE_ENGINE', 'numpy')
+RESTAURANT_SEARCH_RADIUS_KM = env.float('RESTAURANT_SEARCH_RADIUS_KM', 50)
+RESTAURANT_INDEX_CELL_SIZE = env.float('RESTAURANT_INDEX_CELL_SIZE', 0.05)
+RESTAURANT_INDEX_CHECK_INTERVAL = env.float(
+    'RESTAURANT_INDEX_CHECK_INTERVAL',
+    5
+)
+
+GEOCODE_CACHE_SIZE = env.int('GEOCODE_CACHE_SIZE', 10000)
+GEOCODE_CACHE_TTL_DAYS = env.int('GEOCODE_CACHE_TTL_DAYS', 30)
+
+GEOCODE_WORKER_THREADS = env.int('GEOCODE_WORKER_THREADS', 4)
+GEOCODE_JOB_MAX_ATTEMPTS = env.int('GEOCODE_JOB_MAX_ATTEMPTS', 5)
+GEOCODE_JOB_TIMEOUT = env.int('GEOCODE_JOB_TIMEOUT', 300)
+GEOCODE_JOB_RETRY_DELAY = env.int('GEOCODE_JOB_RETRY_DELAY', 10)
+GEOCODE_JOB_MAX_RETRY_DELAY = env.int('GEOCODE_JOB_MAX_RETRY_DELAY', 60 * 60)
+GEOCODE_RATE_LIMIT = env.float('GEOCODE_RATE_LIMIT', 10)
 
 ROLLBAR_ENABLED = env.bool('ROLLBAR_ENABLED')
 